@@ -32,7 +32,9 @@ from Autodesk.Revit.DB import *
 from Autodesk.Revit.DB import (
     BuiltInCategory,
     BuiltInParameter,
+    BoundingBoxIntersectsFilter,
     ElementId,
+    ElementOwnerViewFilter,
     FamilySymbol,
     FamilyInstance,
     FilteredElementCollector,
@@ -42,13 +44,16 @@ from Autodesk.Revit.DB import (
     FilterStringBeginsWith,
     FilterStringContains,
     FilterStringEquals,
+    LogicalOrFilter,
+    Outline,
     XYZ,
     Transaction,
+    TransactionGroup,
+    TransactionStatus,
     TextNote,
     TextNoteType,
     TextNoteOptions,
     IndependentTag,
-    UV,
     UnitTypeId,
     Reference,
     TagMode,
@@ -81,26 +86,19 @@ from System.Collections.Generic import List
 
 import clr
 import System
-import System.IO
 
 clr.AddReference("System")
 clr.AddReference("System.Windows.Forms")
 clr.AddReference("System.Drawing")
-clr.AddReference("RevitServices")
 clr.AddReference("RevitAPI")
 clr.AddReference("RevitAPIUI")
 clr.AddReference("WindowsBase")
-from RevitServices.Persistence import DocumentManager
 from System.Windows.Forms import (
-    FormBorderStyle,
-    AnchorStyles,
-    AutoScaleMode,
     Form,
-    ComboBox,
     ListBox,
-    PictureBox,
-    PictureBoxSizeMode,
     DataGridView,
+    DataGridViewRow,
+    DataGridViewColumn,
     DataGridViewTextBoxColumn,
     DataGridViewButtonColumn,
     DataGridViewAutoSizeColumnsMode,
@@ -110,16 +108,14 @@ from System.Windows.Forms import (
     Button,
     MessageBox,
     DialogResult,
-    Label,
-    ScrollBars,
-    Application,
 )
-from System.Drawing import Image, Point, Color, Rectangle, Size
-from System.IO import MemoryStream
-from System.Windows.Forms import DataGridViewButtonColumn
+from System.Drawing import Point, Color, Rectangle, Size
 
 from System import Array
+from System.Reflection import BindingFlags
 import math, re, sys
+from collections import defaultdict
+from operator import itemgetter
 
 # ==================================================
 # Revit Document Setup
@@ -136,10 +132,57 @@ def debug(*args):
         print(" ".join([str(a) for a in args]))
 
 
+# numeric prefab code such as "4.1.1" inside a text note
+BASE_CODE_RE = re.compile(r"([\d\.]+)")
+
+
 # ==================================================
 # Helper Functions
 # ==================================================
 
+# Active-view bounding boxes keyed by element id; only valid while the model
+# is unchanged, so clear_geometry_caches() is called after the editor closes
+bbox_cache = {}
+# marks "not cached yet", so elements without a box (None) are cached too
+_NOT_CACHED = object()
+
+
+def get_bbox(el):
+    key = el.Id.IntegerValue
+    bbox = bbox_cache.get(key, _NOT_CACHED)
+    if bbox is _NOT_CACHED:
+        bbox = el.get_BoundingBox(uidoc.ActiveView)
+        bbox_cache[key] = bbox
+    return bbox
+
+
+# (cx, cy, cz) bounding-box centers (or None), derived once from the boxes
+center_cache = {}
+
+
+def get_center(el):
+    key = el.Id.IntegerValue
+    center = center_cache.get(key, _NOT_CACHED)
+    if center is _NOT_CACHED:
+        bbox = get_bbox(el)
+        center = None
+        if bbox:
+            bmin = bbox.Min
+            bmax = bbox.Max
+            center = (
+                (bmin.X + bmax.X) / 2.0,
+                (bmin.Y + bmax.Y) / 2.0,
+                (bmin.Z + bmax.Z) / 2.0,
+            )
+        center_cache[key] = center
+    return center
+
+
+def clear_geometry_caches():
+    """Forget cached boxes and centers once the model may have changed."""
+    bbox_cache.clear()
+    center_cache.clear()
+
 
 # --- Boundary Selection Functions ---
 class DetailLineSelectionFilter(ISelectionFilter):
@@ -154,61 +197,72 @@ class DetailLineSelectionFilter(ISelectionFilter):
         return False
 
 
-def points_are_close(pt1, pt2, tol=1e-6):
-    return (
-        abs(pt1.X - pt2.X) < tol
-        and abs(pt1.Y - pt2.Y) < tol
-        and abs(pt1.Z - pt2.Z) < tol
-    )
+# Boundaries are plan-view detail lines, so all polygon math is 2D (X, Y only).
+def endpoint_key(xy, inv_tol=1e6):
+    """Quantize an (x, y) point so coincident endpoints hash alike."""
+    return (int(round(xy[0] * inv_tol)), int(round(xy[1] * inv_tol)))
 
 
 def order_segments_to_polygon(segments):
+    """segments: ((x, y), (x, y), start_key, end_key) tuples keyed by endpoint_key.
+    Returns the loop as a list of (x, y) vertices, or None if it is not closed."""
     if not segments:
         return None
+
+    # endpoint key -> [(segment index, far endpoint key, far endpoint)]
+    adjacency = defaultdict(list)
+    for idx, (ptA, ptB, keyA, keyB) in enumerate(segments):
+        adjacency[keyA].append((idx, keyB, ptB))
+        adjacency[keyB].append((idx, keyA, ptA))
+
+    used = [False] * len(segments)
+    used[0] = True
+    remaining = len(segments) - 1
     polygon = [segments[0][0], segments[0][1]]
-    segments.pop(0)
-    changed = True
-    while segments and changed:
-        changed = False
-        last_pt = polygon[-1]
-        for idx, seg in enumerate(segments):
-            ptA, ptB = seg
-            if points_are_close(last_pt, ptA):
-                polygon.append(ptB)
-                segments.pop(idx)
-                changed = True
+    start_key = segments[0][2]
+    last_key = segments[0][3]
+    while remaining:
+        for idx, far_key, far_pt in adjacency.get(last_key, ()):
+            if not used[idx]:
                 break
-            elif points_are_close(last_pt, ptB):
-                polygon.append(ptA)
-                segments.pop(idx)
-                changed = True
-                break
-    if polygon and points_are_close(polygon[0], polygon[-1]):
+        else:
+            break
+        used[idx] = True
+        remaining -= 1
+        polygon.append(far_pt)
+        last_key = far_key
+    if last_key == start_key:
         polygon.pop()
         return polygon
     else:
         return None
 
 
-def is_point_inside_polygon(point, polygon):
-    x = point.X
-    y = point.Y
-    inside = False
-    n = len(polygon)
+def points_inside_polygon(xs, ys, px, py):
+    """Ray-cast a batch of points, walking the edges in the outer loop so
+    each edge's slope is computed once for all points."""
+    count = len(xs)
+    inside = [False] * count
+    n = len(px)
     j = n - 1
     for i in range(n):
-        xi = polygon[i].X
-        yi = polygon[i].Y
-        xj = polygon[j].X
-        yj = polygon[j].Y
-        if ((yi > y) != (yj > y)) and (
-            x < (xj - xi) * (y - yi) / ((yj - yi) or 1e-12) + xi
-        ):
-            inside = not inside
+        xi = px[i]
+        yi = py[i]
+        xj = px[j]
+        yj = py[j]
+        slope = (xj - xi) / ((yj - yi) or 1e-12)
+        for k in range(count):
+            y = ys[k]
+            if ((yi > y) != (yj > y)) and (xs[k] < slope * (y - yi) + xi):
+                inside[k] = not inside[k]
         j = i
     return inside
 
 
+# Half-height of the plan-region query box (feet); the boundary is 2D so any Z passes
+REGION_Z_EXTENT = 1.0e5
+
+
 def select_boundary_and_gather():
     try:
         selection_refs = uidoc.Selection.PickObjects(
@@ -228,40 +282,72 @@ def select_boundary_and_gather():
             curve = elem.GeometryCurve
             start = curve.GetEndPoint(0)
             end = curve.GetEndPoint(1)
-            segments.append((start, end))
+            start_xy = (start.X, start.Y)
+            end_xy = (end.X, end.Y)
+            segments.append(
+                (start_xy, end_xy, endpoint_key(start_xy), endpoint_key(end_xy))
+            )
         except Exception:
             continue
 
-    polygon = order_segments_to_polygon(segments[:])
+    polygon = order_segments_to_polygon(segments)
     if polygon is None:
         MessageBox.Show(
             "The selected detail lines do not form a closed boundary.", "Error"
         )
         return None
 
+    # flat vertex coordinates, shared by every point-in-polygon test
+    px = [x for x, _ in polygon]
+    py = [y for _, y in polygon]
+
+    # polygon extents: cheap rejection before the ray cast
+    poly_min_x, poly_max_x = min(px), max(px)
+    poly_min_y, poly_max_y = min(py), max(py)
+
+    # let Revit's spatial index skip everything away from the boundary extents.
+    # That index only knows model extents, which view-owned annotations (text
+    # notes, tags) may lack, so those always go on to the center test below.
+    view_id = uidoc.ActiveView.Id
+    region_filter = LogicalOrFilter(
+        BoundingBoxIntersectsFilter(
+            Outline(
+                XYZ(poly_min_x, poly_min_y, -REGION_Z_EXTENT),
+                XYZ(poly_max_x, poly_max_y, REGION_Z_EXTENT),
+            )
+        ),
+        ElementOwnerViewFilter(view_id),
+    )
     collector = (
-        FilteredElementCollector(doc, uidoc.ActiveView.Id)
+        FilteredElementCollector(doc, view_id)
+        .WherePasses(region_filter)
         .WhereElementIsNotElementType()
-        .ToElements()
     )
-    elements_inside = []
+
+    # collect bbox centers first, then test them against the polygon in one batch
+    candidates, xs, ys = [], [], []
+    # bind loop-invariant lookups to locals once
+    _get_center = get_center
+    _add_candidate = candidates.append
+    _add_x = xs.append
+    _add_y = ys.append
     for elem in collector:
-        bbox = elem.get_BoundingBox(uidoc.ActiveView)
-        if bbox:
-            center = XYZ(
-                (bbox.Min.X + bbox.Max.X) / 2.0,
-                (bbox.Min.Y + bbox.Max.Y) / 2.0,
-                (bbox.Min.Z + bbox.Max.Z) / 2.0,
-            )
-            if is_point_inside_polygon(center, polygon):
-                elements_inside.append(elem)
+        center = _get_center(elem)
+        if center is None:
+            continue
+        cx, cy = center[0], center[1]
+        if not (poly_min_x <= cx <= poly_max_x and poly_min_y <= cy <= poly_max_y):
+            continue
+        _add_candidate(elem)
+        _add_x(cx)
+        _add_y(cy)
 
-    MessageBox.Show(
-        "Found {0} element(s) inside the selected boundary.".format(
-            len(elements_inside)
-        ),
-        "Boundary Selection",
-    )
+    inside = points_inside_polygon(xs, ys, px, py)
+    elements_inside = [e for e, ok in zip(candidates, inside) if ok]
+
+    count = str(len(elements_inside))
+    msg = "Found " + count + " element(s) inside the selected boundary."
+    MessageBox.Show(msg, "Boundary Selection")
     return elements_inside
 
 
@@ -283,74 +369,176 @@ def convert_param_to_string(param_obj):
         return ""
 
 
-def get_region_bounding_box(elements):
-    valid_found = False
-    overall_min_x = float("inf")
-    overall_min_y = float("inf")
-    overall_min_z = float("inf")
-    overall_max_x = float("-inf")
-    overall_max_y = float("-inf")
-    overall_max_z = float("-inf")
+def get_params_by_name(elem):
+    """Map parameter name -> Parameter; the first match wins, as in LookupParameter."""
+    params = {}
+    for p in elem.Parameters:
+        params.setdefault(p.Definition.Name, p)
+    return params
+
+
+def get_param(elem, name):
+    """First parameter called name, filtered natively by GetParameters."""
+    for p in elem.GetParameters(name):
+        return p
+    return None
+
 
+# diameter parameters, in order of preference
+DIAMETER_PARAM_NAMES = ("Outside Diameter", "Diameter", "Nominal Diameter")
+
+
+def get_diameter_param(elem, name_by_type, names=DIAMETER_PARAM_NAMES):
+    """
+    First of `names` that elem carries, or None. The name that works is the
+    same for every instance of a type, so it is looked up once per type and
+    remembered in name_by_type (type id -> name or None).
+    """
+    type_key = elem.GetTypeId().IntegerValue
+    if type_key in name_by_type:
+        pname = name_by_type[type_key]
+        return get_param(elem, pname) if pname else None
+    for pname in names:
+        p = get_param(elem, pname)
+        if p:
+            name_by_type[type_key] = pname
+            return p
+    name_by_type[type_key] = None
+    return None
+
+
+def collect_fitting_family_names(view, elements=None):
+    """
+    Map pipe-fitting id -> lower-cased family name. The fittings are taken
+    from `elements` when given (e.g. the already gathered region), otherwise
+    collected from the view.
+    """
+    if elements is None:
+        elements = (
+            FilteredElementCollector(doc, view.Id)
+            .OfCategory(BuiltInCategory.OST_PipeFitting)
+            .WhereElementIsNotElementType()
+        )
+    fitting_cat = int(BuiltInCategory.OST_PipeFitting)
+    family_names = {}
+    # symbol id -> family name; instances of one type share it
+    name_by_type = {}
+    for e in elements:
+        if not e.Category or e.Category.Id.IntegerValue != fitting_cat:
+            continue
+        family_name = ""
+        if isinstance(e, FamilyInstance):
+            type_key = e.GetTypeId().IntegerValue
+            family_name = name_by_type.get(type_key)
+            if family_name is None:
+                family_name = ""
+                symbol = e.Symbol
+                if symbol and symbol.Family:
+                    family_name = symbol.Family.Name.lower()
+                name_by_type[type_key] = family_name
+        family_names[e.Id.IntegerValue] = family_name
+    return family_names
+
+
+def iter_connector_neighbors(conn, skip_id):
+    """Owners of a connector's refs, except the element with id skip_id."""
+    for ref in conn.AllRefs:
+        owner = ref.Owner
+        if owner.Id != skip_id:
+            yield owner
+
+
+# multi-host tags (GetTaggedElementIds -> LinkElementIds) depend on the Revit
+# version, not on the tag, so the API is probed once instead of per tag
+TAGS_HAVE_MULTI_HOST = hasattr(IndependentTag, "GetTaggedElementIds")
+
+
+def get_tagged_host_ids(tag):
+    """Integer ids of the elements a tag is attached to, in tag order."""
+    if TAGS_HAVE_MULTI_HOST:
+        return [
+            rid.HostElementId.IntegerValue for rid in tag.GetTaggedElementIds() if rid
+        ]
+    rid = tag.TaggedElementId
+    return [rid.IntegerValue] if rid else []
+
+
+def collect_pipe_tags_by_host(view):
+    """Map host element id -> id of the first pipe tag on it in a view."""
+    host_to_tag = {}
+    for t in (
+        FilteredElementCollector(doc, view.Id)
+        .OfCategory(BuiltInCategory.OST_PipeTags)
+        .WhereElementIsNotElementType()
+    ):
+        for eid in get_tagged_host_ids(t):
+            host_to_tag.setdefault(eid, t.Id)
+    return host_to_tag
+
+
+def get_region_bounding_box(elements):
+    inf = float("inf")
+    # one pass gathering coordinates, then min/max reductions over each axis
+    min_xs, min_ys, min_zs = [], [], []
+    max_xs, max_ys, max_zs = [], [], []
+    view = uidoc.ActiveView
     for el in elements:
+        # read live, not from bbox_cache: the editor may have changed or
+        # deleted elements since they were gathered
         try:
-            bbox = el.get_BoundingBox(uidoc.ActiveView)
+            bbox = el.get_BoundingBox(view)
         except:
             continue  # skip if element was just deleted
         if not bbox:
             continue
-        if bbox is None:
+        bmin = bbox.Min
+        if inf in (bmin.X, bmin.Y, bmin.Z):
             continue
-        if (
-            bbox.Min.X == float("inf")
-            or bbox.Min.Y == float("inf")
-            or bbox.Min.Z == float("inf")
-        ):
-            continue
-        valid_found = True
-        overall_min_x = min(overall_min_x, bbox.Min.X)
-        overall_min_y = min(overall_min_y, bbox.Min.Y)
-        overall_min_z = min(overall_min_z, bbox.Min.Z)
-        overall_max_x = max(overall_max_x, bbox.Max.X)
-        overall_max_y = max(overall_max_y, bbox.Max.Y)
-        overall_max_z = max(overall_max_z, bbox.Max.Z)
-
-    if not valid_found:
+        bmax = bbox.Max
+        min_xs.append(bmin.X)
+        min_ys.append(bmin.Y)
+        min_zs.append(bmin.Z)
+        max_xs.append(bmax.X)
+        max_ys.append(bmax.Y)
+        max_zs.append(bmax.Z)
+
+    if not min_xs:
         return XYZ(0, 0, 0), XYZ(0, 0, 0)
 
-    overall_min = XYZ(overall_min_x, overall_min_y, overall_min_z)
-    overall_max = XYZ(overall_max_x, overall_max_y, overall_max_z)
+    overall_min = XYZ(min(min_xs), min(min_ys), min(min_zs))
+    overall_max = XYZ(max(max_xs), max(max_ys), max(max_zs))
     return overall_min, overall_max
 
 
-def create_pipe_tags_for_untagged_pipes(doc, pipes, view):
-    t = Transaction(doc, "Add Missing Pipe Tags")
-    t.Start()
-    for pipe in pipes:
-        bbox = pipe.get_BoundingBox(view)
-        if not bbox:
-            continue
-        center = XYZ(
-            (bbox.Min.X + bbox.Max.X) / 2.0,
-            (bbox.Min.Y + bbox.Max.Y) / 2.0,
-            (bbox.Min.Z + bbox.Max.Z) / 2.0,
-        )
-        pipe_ref = Reference(pipe)
-        IndependentTag.Create(
-            doc,
-            view.Id,
-            pipe_ref,
-            True,
-            TagMode.TM_ADDBY_CATEGORY,
-            TagOrientation.Horizontal,
-            UV(center.X, center.Y),
-        )
-    t.Commit()
-
-
 # ==================================================
 # UI Class: ElementEditorForm
 # ==================================================
+# "None" is a Python keyword, so the enum member has to be fetched by name
+AUTOSIZE_NONE = getattr(DataGridViewAutoSizeColumnsMode, "None")
+
+# name/family tokens that decide a fitting's Flip button, found in one scan
+FITTING_TOKENS_RE = re.compile(r"var\. dn/od|multibocht|liggend|multireducer(?:_geb)?")
+
+# elbows on a vertical pipe wider than 100 mm get 2x45°; in internal feet
+ELBOW_2X45_MIN_DIAM_FT = 100.0 / 304.8
+
+# editor text columns in grid order: (name, header, read-only, width);
+# the TagStatus button column is appended after these
+EDITOR_TEXT_COLUMNS = [
+    ("Id", "Element Id", True, 70),
+    ("Category", "Category", True, 80),
+    ("Name", "Name", True, 170),
+    ("Warning", "Warning", True, 90),
+    ("Bend45", "2x45°", True, 50),
+    ("DefaultCode", "Default Code", True, 80),
+    ("NewCode", "New Code", False, 80),
+    ("OutsideDiameter", "Outside Diameter", True, 70),
+    ("Length", "Length", True, 60),
+    ("Size", "Size", True, 60),
+    ("GEB_Article_Number", "GEB Article No.", True, 80),
+]
+
+
 class ElementEditorForm(Form):
     def __init__(self, elements_data, region_elements=None):
         self.Text = "Edit Element Codes"
@@ -359,6 +547,10 @@ class ElementEditorForm(Form):
         self.MinimumSize = Size(700, 400)
         self.SuspendLayout()
         self.regionElements = region_elements
+        # row selection -> Revit selection: ElementIds built once per id, and
+        # one id list reused for every SetElementIds call
+        self._eid_cache = {}
+        self._selection_ids = List[ElementId]()
 
         # --- 1. Bottom Buttons Panel FIRST
         self.buttonPanel = System.Windows.Forms.Panel()
@@ -374,94 +566,40 @@ class ElementEditorForm(Form):
         self.dataGrid = DataGridView()
         self.dataGrid.SelectionChanged += self.on_row_selected
         self.dataGrid.Dock = DockStyle.Fill
-        self.dataGrid.AutoSizeColumnsMode = DataGridViewAutoSizeColumnsMode.Fill
+        # fixed column widths: no re-measuring of every row on adds and edits
+        self.dataGrid.AutoSizeColumnsMode = AUTOSIZE_NONE
         self.dataGrid.CellContentClick += self.dataGrid_CellContentClick
         self.dataGrid.MultiSelect = True
         self.dataGrid.SelectionMode = DataGridViewSelectionMode.FullRowSelect
+        # DoubleBuffered is protected on DataGridView, so it is set by reflection
+        self.dataGrid.GetType().GetProperty(
+            "DoubleBuffered", BindingFlags.NonPublic | BindingFlags.Instance
+        ).SetValue(self.dataGrid, True, None)
         self.gridPanel.Controls.Add(self.dataGrid)
 
         # --- 3. Columns
-        self.colId = DataGridViewTextBoxColumn()
-        self.colId.Name = "Id"
-        self.colId.HeaderText = "Element Id"
-        self.colId.ReadOnly = True
-
-        self.colCategory = DataGridViewTextBoxColumn()
-        self.colCategory.Name = "Category"
-        self.colCategory.HeaderText = "Category"
-        self.colCategory.ReadOnly = True
-
         self.category_headers = {}
         self.collapsed_categories = set()
 
-        self.colName = DataGridViewTextBoxColumn()
-        self.colName.Name = "Name"
-        self.colName.HeaderText = "Name"
-        self.colName.ReadOnly = True
-
-        self.colWarning = DataGridViewTextBoxColumn()
-        self.colWarning.Name = "Warning"
-        self.colWarning.HeaderText = "Warning"
-        self.colWarning.ReadOnly = True
-
-        self.colBend45 = DataGridViewTextBoxColumn()
-        self.colBend45.Name = "Bend45"
-        self.colBend45.HeaderText = "2x45°"
-        self.colBend45.ReadOnly = True
-
-        self.colDefaultCode = DataGridViewTextBoxColumn()
-        self.colDefaultCode.Name = "DefaultCode"
-        self.colDefaultCode.HeaderText = "Default Code"
-        self.colDefaultCode.ReadOnly = True
-
-        self.colNewCode = DataGridViewTextBoxColumn()
-        self.colNewCode.Name = "NewCode"
-        self.colNewCode.HeaderText = "New Code"
-        self.colNewCode.ReadOnly = False
-
-        self.colOD = DataGridViewTextBoxColumn()
-        self.colOD.Name = "OutsideDiameter"
-        self.colOD.HeaderText = "Outside Diameter"
-        self.colOD.ReadOnly = True
-
-        self.colLength = DataGridViewTextBoxColumn()
-        self.colLength.Name = "Length"
-        self.colLength.HeaderText = "Length"
-        self.colLength.ReadOnly = True
-
-        self.colSize = DataGridViewTextBoxColumn()
-        self.colSize.Name = "Size"
-        self.colSize.HeaderText = "Size"
-        self.colSize.ReadOnly = True
-
-        self.colArticle = DataGridViewTextBoxColumn()
-        self.colArticle.Name = "GEB_Article_Number"
-        self.colArticle.HeaderText = "GEB Article No."
-        self.colArticle.ReadOnly = True
-
-        self.colTagStatus = DataGridViewButtonColumn()
-        self.colTagStatus.Name = "TagStatus"
-        self.colTagStatus.HeaderText = "Tags"
-        self.colTagStatus.UseColumnTextForButtonValue = False
-
-        self.dataGrid.Columns.AddRange(
-            Array[DataGridViewTextBoxColumn](
-                [
-                    self.colId,
-                    self.colCategory,
-                    self.colName,
-                    self.colWarning,
-                    self.colBend45,
-                    self.colDefaultCode,
-                    self.colNewCode,
-                    self.colOD,
-                    self.colLength,
-                    self.colSize,
-                ]
-            )
-        )
-        self.dataGrid.Columns.Add(self.colArticle)
-        self.dataGrid.Columns.Add(self.colTagStatus)
+        columns = []
+        for name, header, read_only, width in EDITOR_TEXT_COLUMNS:
+            col = DataGridViewTextBoxColumn()
+            col.Name = name
+            col.HeaderText = header
+            col.ReadOnly = read_only
+            col.Width = width
+            columns.append(col)
+
+        colTagStatus = DataGridViewButtonColumn()
+        colTagStatus.Name = "TagStatus"
+        colTagStatus.HeaderText = "Tags"
+        colTagStatus.Width = 85
+        colTagStatus.UseColumnTextForButtonValue = False
+        columns.append(colTagStatus)
+
+        self.dataGrid.Columns.AddRange(Array[DataGridViewColumn](columns))
+        # column name -> index, so cells are addressed by position, not by name
+        self._ix = {c.Name: c.Index for c in self.dataGrid.Columns}
 
         # 1. Text Note Code Input with Example Text
         self.txtTextNoteCode = TextBox()
@@ -522,269 +660,354 @@ class ElementEditorForm(Form):
         # --- 6. State
         self.textNotePlaced = False
         self.Result = None
+        # family names of the fittings; the gathered region already holds
+        # every fitting shown in the grid, so no second collector pass
+        self.fittingFamilyNames = collect_fitting_family_names(
+            uidoc.ActiveView, region_elements
+        )
 
         # --- 7. Populate Rows
+        # classify every row first: (TagStatus, TagStatus read-only, back color)
+        classified = []
         for ed in elements_data:
-            row_idx = self.dataGrid.Rows.Add()
-            row = self.dataGrid.Rows[row_idx]
-            row.Cells["Id"].Value = ed["Id"]
-            row.Cells["Category"].Value = ed["Category"]
-            row.Cells["Name"].Value = ed["Name"]
-            row.Cells["Warning"].Value = ed.get("Warning", "")
-            row.Cells["Bend45"].Value = ed.get("Bend45", "")
-            row.Cells["GEB_Article_Number"].Value = ed.get("GEB_Article_Number", "")
-            row.Cells["DefaultCode"].Value = ed["DefaultCode"]
-            row.Cells["NewCode"].Value = ed["NewCode"]
-            row.Cells["OutsideDiameter"].Value = ed["OutsideDiameter"]
-            row.Cells["Length"].Value = ed["Length"]
-            row.Cells["Size"].Value = ed.get("Size", "")
-
             # TagStatus logic
             cat = ed["Category"]
-            name = ed["Name"]
-            name_lc = name.lower()
-            warning_val = row.Cells["Warning"].Value or ""
-            debug(">> Pipe Fitting Name:", name)
+            name_lc = ed["Name"].lower()
+            tag_status = ""
+            tag_readonly = False
+            back_color = None
 
             if cat == "Pipes":
                 if ed["TagStatus"] == "Yes":
-                    row.Cells["TagStatus"].Value = "Remove Tag"
+                    tag_status = "Remove Tag"
                 else:
-                    row.Cells["TagStatus"].Value = "Add/Place Tag"
-                row.DefaultCellStyle.BackColor = Color.LightBlue
+                    tag_status = "Add/Place Tag"
+                back_color = Color.LightBlue
 
             elif cat == "Pipe Tags":
-                row.Cells["TagStatus"].Value = "Remove Tag"
-                row.DefaultCellStyle.BackColor = Color.LightGreen
+                tag_status = "Remove Tag"
+                back_color = Color.LightGreen
 
             elif cat == "Text Notes":
-                row.Cells["TagStatus"].Value = ""
-                row.DefaultCellStyle.BackColor = Color.LightGray
+                back_color = Color.LightGray
 
             elif cat == "Pipe Fittings":
-                elem = doc.GetElement(ElementId(int(ed["Id"])))
-                family_name = ""
-                if isinstance(elem, FamilyInstance):
-                    symbol = elem.Symbol
-                    if symbol and symbol.Family:
-                        family_name = symbol.Family.Name.lower()
-
-                row.Cells["TagStatus"].Value = ""
-                row.Cells["TagStatus"].ReadOnly = True
-
-                if "var. dn/od" in name_lc:
-                    if "multibocht" in name_lc or "multibocht" in family_name:
-                        row.Cells["TagStatus"].Value = "Flip 2x45°"
-                        row.Cells["TagStatus"].ReadOnly = False
-                    elif "liggend" in name_lc or "liggend" in family_name:
-                        row.Cells["TagStatus"].Value = "Flip T-stuk"
-                        row.Cells["TagStatus"].ReadOnly = False
-                        # row.DefaultCellStyle.BackColor = Color.LightGoldenrodYellow
-                    elif "multireducer" in name_lc or "multireducer_geb" in family_name:
-                        row.Cells["TagStatus"].Value = "Flip Reducer"
-                        row.Cells["TagStatus"].ReadOnly = False
-
-                row.DefaultCellStyle.BackColor = Color.LightGoldenrodYellow
+                family_name = self.fittingFamilyNames.get(ed["IdInt"], "")
+
+                tag_readonly = True
+
+                name_tokens = set(FITTING_TOKENS_RE.findall(name_lc))
+                if "var. dn/od" in name_tokens:
+                    tokens = name_tokens.union(FITTING_TOKENS_RE.findall(family_name))
+                    if "multibocht" in tokens:
+                        tag_status = "Flip 2x45°"
+                        tag_readonly = False
+                    elif "liggend" in tokens:
+                        tag_status = "Flip T-stuk"
+                        tag_readonly = False
+                    elif "multireducer" in name_tokens or "multireducer_geb" in tokens:
+                        tag_status = "Flip Reducer"
+                        tag_readonly = False
+
+                back_color = Color.LightGoldenrodYellow
+
+            classified.append((tag_status, tag_readonly, back_color))
+
+        # rows are built off-grid and added in one range; layout is held off
+        # until then
+        self.dataGrid.SuspendLayout()
+        # detached rows cannot resolve cells by column name, so index them
+        tag_ix = self._ix["TagStatus"]
+        new_rows = []
+        for ed, (tag_status, tag_readonly, back_color) in zip(
+            elements_data, classified
+        ):
+            row = DataGridViewRow()
+            row.CreateCells(self.dataGrid)
+            # integer element id, read back by the handlers
+            row.Tag = ed["IdInt"]
+            # value order must match the column order added in step 3
+            row.SetValues(
+                Array[object](
+                    [
+                        ed["Id"],
+                        ed["Category"],
+                        ed["Name"],
+                        ed.get("Warning", ""),
+                        ed.get("Bend45", ""),
+                        ed["DefaultCode"],
+                        ed["NewCode"],
+                        ed["OutsideDiameter"],
+                        ed["Length"],
+                        ed.get("Size", ""),
+                        ed.get("GEB_Article_Number", ""),
+                        tag_status,
+                    ]
+                )
+            )
+            if tag_readonly:
+                row.Cells[tag_ix].ReadOnly = True
+            if back_color is not None:
+                row.DefaultCellStyle.BackColor = back_color
+            new_rows.append(row)
+
+        self.dataGrid.Rows.AddRange(Array[DataGridViewRow](new_rows))
+        # element id -> grid row, and category -> rows in grid order; kept in
+        # step by _add_row and _remove_row
+        self._row_by_id = {}
+        self._rows_by_cat = defaultdict(list)
+        cat_ix = self._ix["Category"]
+        for r in self.dataGrid.Rows:
+            if not r.IsNewRow:
+                self._row_by_id[r.Tag] = r
+                self._rows_by_cat[r.Cells[cat_ix].Value].append(r)
+        self.dataGrid.ResumeLayout()
 
     def auto_fix_inline(self):
         updated = 0
         skipped = 0
+        # id -> (element, params) of every fitting visited, for the caller to reuse
+        fittings = {}
+        fit_rows = self._rows_by_cat.get("Pipe Fittings")
+        if not fit_rows:
+            return updated, skipped, fittings
 
-        for row in self.dataGrid.Rows:
-            try:
-                cat = row.Cells["Category"].Value
-                if cat != "Pipe Fittings":
-                    continue
-
-                eid = int(str(row.Cells["Id"].Value))
-                elem = doc.GetElement(ElementId(eid))
-                if not elem or not elem.IsValidObject:
-                    continue
-
-                name = elem.Name
-                debug("Checking:", elem.Id, "| Name:", name)
-
-                # 1. Fix concentric reducers
-                reducer_fixed = False
-                p_warn = elem.LookupParameter("waarschuwing")
-                warning = p_warn.AsString() if p_warn else ""
-                debug(" -> Warning:", warning)
+        # connected element type id -> its diameter parameter name (or None)
+        diameter_name_by_type = {}
 
-                has_concentric_warning = warning and "concentric" in warning.lower()
-
-                has_reducer_params = any(
-                    elem.LookupParameter(pn)
-                    for pn in [
-                        "kort_verloop (kleinste)",
-                        "kort_verloop (grootste)",
-                        "reducer_eccentric",
-                        "switch_excentriciteit",
-                    ]
-                )
-                if has_concentric_warning and has_reducer_params:
-                    param_map = {
-                        "kort_verloop (kleinste)": True,
-                        "kort_verloop (grootste)": True,
-                        "reducer_eccentric": True,
-                        "switch_excentriciteit": False,
-                    }
-                    t = Transaction(doc, "Fix Reducer")
-                    t.Start()
-                    for pname, value in param_map.items():
-                        p = elem.LookupParameter(pname)
-                        if p and p.StorageType == StorageType.Integer:
-                            p.Set(1 if value else 0)
-                    t.Commit()
-                    debug(" -> Reducer fixed.")
-                    updated += 1
-                    reducer_fixed = True
-
-                # 2. Turn OFF 2x45°
-                p_bend = elem.LookupParameter("2x45°")
-                if p_bend and p_bend.StorageType == StorageType.Integer:
-                    if p_bend.AsInteger() == 1:
-                        debug(" -> Turning OFF 2x45°")
-                        t = Transaction(doc, "Turn off 2x45°")
-                        t.Start()
-                        p_bend.Set(0)
-                        t.Commit()
+        # one transaction for every fitting fixed in this pass
+        t = Transaction(doc, "Auto-Fix Fittings")
+        t.Start()
+        try:
+            for row in fit_rows:
+                try:
+                    eid = row.Tag
+                    elem = doc.GetElement(ElementId(eid))
+                    if not elem or not elem.IsValidObject:
+                        continue
+                    params = get_params_by_name(elem)
+                    fittings[eid] = (elem, params)
+
+                    if VERBOSE:
+                        # elem.Name is an API call, only made when tracing
+                        debug("Checking:", elem.Id, "| Name:", elem.Name)
+
+                    # 1. Fix concentric reducers
+                    reducer_fixed = False
+                    p_warn = params.get("waarschuwing")
+                    warning = p_warn.AsString() if p_warn else ""
+                    debug(" -> Warning:", warning)
+
+                    has_concentric_warning = warning and "concentric" in warning.lower()
+
+                    has_reducer_params = any(
+                        pn in params
+                        for pn in (
+                            "kort_verloop (kleinste)",
+                            "kort_verloop (grootste)",
+                            "reducer_eccentric",
+                            "switch_excentriciteit",
+                        )
+                    )
+                    if has_concentric_warning and has_reducer_params:
+                        param_map = {
+                            "kort_verloop (kleinste)": True,
+                            "kort_verloop (grootste)": True,
+                            "reducer_eccentric": True,
+                            "switch_excentriciteit": False,
+                        }
+                        for pname, value in param_map.items():
+                            p = params.get(pname)
+                            if p and p.StorageType == StorageType.Integer:
+                                p.Set(1 if value else 0)
+                        debug(" -> Reducer fixed.")
                         updated += 1
+                        reducer_fixed = True
+
+                    # 2. Turn OFF 2x45°
+                    p_bend = params.get("2x45°")
+                    if p_bend and p_bend.StorageType == StorageType.Integer:
+                        if p_bend.AsInteger() == 1:
+                            debug(" -> Turning OFF 2x45°")
+                            p_bend.Set(0)
+                            updated += 1
+                        elif not reducer_fixed:
+                            debug(" -> 2x45° already OFF")
+                            skipped += 1
                     elif not reducer_fixed:
-                        debug(" -> 2x45° already OFF")
                         skipped += 1
-                elif not reducer_fixed:
-                    skipped += 1
 
-                # Auto toggle 2x45 degree for elbows based on vertical pipe diameter
-                if isinstance(elem, FamilyInstance):
-                    fam_name = elem.Symbol.Family.Name.lower()
-                    if "bocht_sh_geb" in fam_name or "bocht" in fam_name:
-                        connector_mgr = elem.MEPModel.ConnectorManager
-                        vertical_diam = None
+                    # Auto toggle 2x45 degree for elbows based on vertical pipe diameter
+                    if isinstance(elem, FamilyInstance):
+                        fam_name = self.fittingFamilyNames.get(eid, "")
+                        if "bocht_sh_geb" in fam_name or "bocht" in fam_name:
+                            connector_mgr = elem.MEPModel.ConnectorManager
+                            vertical_diam = None
 
-                        for conn in connector_mgr.Connectors:
-                            dir = conn.CoordinateSystem.BasisZ
-                            if abs(dir.Z) > 0.9:
-                                try:
-                                    connected = list(conn.AllRefs)
-                                    for ref in connected:
-                                        if ref.Owner.Id != elem.Id and hasattr(
-                                            ref.Owner, "LookupParameter"
+                            for conn in connector_mgr.Connectors:
+                                dir = conn.CoordinateSystem.BasisZ
+                                if abs(dir.Z) > 0.9:
+                                    try:
+                                        for pipe in iter_connector_neighbors(
+                                            conn, elem.Id
                                         ):
-                                            pipe = ref.Owner
-                                            diam_param = pipe.LookupParameter(
-                                                "Outside Diameter"
-                                            ) or pipe.LookupParameter("Diameter")
+                                            diam_param = get_diameter_param(
+                                                pipe,
+                                                diameter_name_by_type,
+                                                ("Outside Diameter", "Diameter"),
+                                            )
                                             if diam_param:
-                                                d_mm = diam_param.AsDouble() * 304.8
-                                                vertical_diam = d_mm
+                                                # internal units (feet)
+                                                vertical_diam = diam_param.AsDouble()
                                                 break
+                                    except Exception as ex:
+                                        debug(
+                                            "⚠️ Failed to resolve vertical pipe diameter:",
+                                            ex,
+                                        )
+                                    # found it; the other connectors are not needed
+                                    if vertical_diam is not None:
+                                        break
+
+                            if vertical_diam is not None:
+                                try:
+                                    bend_param = params.get("2x45°")
+                                    if (
+                                        bend_param
+                                        and bend_param.StorageType
+                                        == StorageType.Integer
+                                    ):
+                                        if vertical_diam > ELBOW_2X45_MIN_DIAM_FT:
+                                            bend_param.Set(1)
+                                            debug(
+                                                "✅ 2x45° turned ON for:",
+                                                elem.Id,
+                                                "| Ø mm =",
+                                                vertical_diam * 304.8,
+                                            )
+                                        else:
+                                            bend_param.Set(0)
+                                            debug(
+                                                "✅ 2x45° turned OFF for:",
+                                                elem.Id,
+                                                "| Ø mm =",
+                                                vertical_diam * 304.8,
+                                            )
+                                        updated += 1
                                 except Exception as ex:
-                                    debug(
-                                        "⚠️ Failed to resolve vertical pipe diameter:",
-                                        ex,
-                                    )
+                                    debug("❌ Failed to set 2x45° on elbow:", ex)
 
-                        if vertical_diam is not None:
+                        # Auto toggle reducer_eccentric for multireducer going UP
+                        elif "multireducer_geb" in fam_name:
                             try:
-                                bend_param = elem.LookupParameter("2x45°")
-                                if (
-                                    bend_param
-                                    and bend_param.StorageType == StorageType.Integer
-                                ):
-                                    t = Transaction(doc, "Set 2x45° for elbow")
-                                    t.Start()
-                                    if vertical_diam > 100:
-                                        bend_param.Set(1)
-                                        debug(
-                                            "✅ 2x45° turned ON for:",
-                                            elem.Id,
-                                            "| Ø =",
-                                            vertical_diam,
+                                connector_mgr = elem.MEPModel.ConnectorManager
+                                is_vertical_up = False
+
+                                for conn in connector_mgr.Connectors:
+                                    # Check if the direction is upward; the refs
+                                    # are only walked for such a connector
+                                    if conn.CoordinateSystem.BasisZ.Z > 0.9:
+                                        neighbors = iter_connector_neighbors(
+                                            conn, elem.Id
                                         )
-                                    else:
-                                        bend_param.Set(0)
+                                        if next(neighbors, None) is not None:
+                                            is_vertical_up = True
+                                            break
+
+                                if is_vertical_up:
+                                    reducer_param = params.get("reducer_eccentric")
+                                    if reducer_param and reducer_param.AsInteger() == 1:
+                                        reducer_param.Set(0)
                                         debug(
-                                            "✅ 2x45° turned OFF for:",
+                                            "✅ Turned OFF reducer_eccentric for vertical-up multireducer:",
                                             elem.Id,
-                                            "| Ø =",
-                                            vertical_diam,
                                         )
-                                    t.Commit()
-                                    updated += 1
+                                        updated += 1
                             except Exception as ex:
-                                debug("❌ Failed to set 2x45° on elbow:", ex)
+                                debug("❌ Failed to auto-toggle reducer_eccentric:", ex)
 
-                    # Auto toggle reducer_eccentric for multireducer going UP
-                    elif "multireducer_geb" in fam_name:
-                        try:
-                            connector_mgr = elem.MEPModel.ConnectorManager
-                            is_vertical_up = False
-
-                            for conn in connector_mgr.Connectors:
-                                dir = conn.CoordinateSystem.BasisZ
-                                if abs(dir.Z) > 0.9:
-                                    connected = list(conn.AllRefs)
-                                    for ref in connected:
-                                        if ref.Owner.Id != elem.Id:
-                                            # Check if the direction is upward
-                                            vec = conn.CoordinateSystem.BasisZ
-                                            if vec.Z > 0.9:
-                                                is_vertical_up = True
-                                                break
-                                    if is_vertical_up:
-                                        break
+                except Exception as ex:
+                    debug("Exception while processing:", ex)
+                    skipped += 1
+            t.Commit()
+        except:
+            if t.GetStatus() == TransactionStatus.Started:
+                t.RollBack()
+            raise
 
-                            if is_vertical_up:
-                                reducer_param = elem.LookupParameter(
-                                    "reducer_eccentric"
-                                )
-                                if reducer_param and reducer_param.AsInteger() == 1:
-                                    t = Transaction(doc, "Auto-Fix Reducer Eccentric")
-                                    t.Start()
-                                    reducer_param.Set(0)
-                                    t.Commit()
-                                    debug(
-                                        "✅ Turned OFF reducer_eccentric for vertical-up multireducer:",
-                                        elem.Id,
-                                    )
-                                    updated += 1
-                        except Exception as ex:
-                            debug("❌ Failed to auto-toggle reducer_eccentric:", ex)
-
-            except Exception as ex:
-                debug("Exception while processing:", ex)
-                skipped += 1
-
-        return updated, skipped
+        return updated, skipped, fittings
 
     def btnFixReducers_Click(self, sender, event):
+        ix = self._ix
 
-        updated, skipped = self.auto_fix_inline()
+        # the auto-fix pass and the per-row fixes below end up as one undo step
+        tg = TransactionGroup(doc, "Fix Reducers")
+        tg.Start()
+        # one transaction for the per-row fixes of every fitting
+        t = Transaction(doc, "Fix Fitting Rows")
+        try:
+            updated, skipped, fittings = self.auto_fix_inline()
+            # no fittings in the grid: leave the journal without an empty commit
+            if fittings:
+                t.Start()
+                self._fix_fitting_rows(fittings)
+                t.Commit()
+            tg.Assimilate()
+        except:
+            if t.GetStatus() == TransactionStatus.Started:
+                t.RollBack()
+            tg.RollBack()
+            raise
+
+        # Re-read parameters from Revit, now that the fixes are committed
+        self.dataGrid.SuspendLayout()
+        for row in self._rows_by_cat.get("Pipe Fittings", []):
+            fitting = fittings.get(row.Tag)
+            if fitting is None:
+                continue
+            _, params = fitting
+            try:
+                p_warn = params.get("waarschuwing")
+                warning_val = p_warn.AsString() if p_warn else ""
+                row.Cells[ix["Warning"]].Value = warning_val
 
-        for row in self.dataGrid.Rows:
-            cat = row.Cells["Category"].Value
-            if cat != "Pipe Fittings":
+                p_bend = params.get("2x45°")
+                if p_bend and p_bend.StorageType == StorageType.Integer:
+                    bend45_val = "Yes" if p_bend.AsInteger() == 1 else "No"
+                    row.Cells[ix["Bend45"]].Value = bend45_val
+            except:
                 continue
+        self.dataGrid.ResumeLayout()
+
+        MessageBox.Show(
+            "✅ Reducers Fixed!\n\nUpdated: {}\nSkipped: {}".format(updated, skipped),
+            "Fix Reducers",
+        )
 
+    def _fix_fitting_rows(self, fittings):
+        """
+        Row-driven fitting fixes (Flip 2x45°, vertical reducers), applied inside
+        the caller's open transaction; `fittings` is from auto_fix_inline.
+        """
+        ix = self._ix
+        for row in self._rows_by_cat.get("Pipe Fittings", []):
             try:
-                eid = int(str(row.Cells["Id"].Value))
-                elem = doc.GetElement(ElementId(eid))
-                if not elem:
+                eid = row.Tag
+                fitting = fittings.get(eid)
+                if fitting is None:
                     continue
+                elem, params = fitting
 
-                name = row.Cells["Name"].Value
-                tag_status = row.Cells["TagStatus"].Value
+                name = row.Cells[ix["Name"]].Value
+                tag_status = row.Cells[ix["TagStatus"]].Value
 
                 # Flip 2x45° logic (manual logic reused)
                 if tag_status == "Flip 2x45°":
                     debug(">> Activating Flip 2x45° for:", name)
                     if isinstance(elem, FamilyInstance):
                         try:
-                            bend_param = elem.LookupParameter("bend_visible")
-                            preserve_param = elem.LookupParameter(
-                                "bend_visible_preserve"
-                            )
+                            bend_param = params.get("bend_visible")
+                            preserve_param = params.get("bend_visible_preserve")
 
                             if (
                                 bend_param
@@ -823,11 +1046,8 @@ class ElementEditorForm(Form):
                         )
 
                         if is_vertical:
-                            reducer_param = elem.LookupParameter("reducer_eccentric")
-                            geom_param = elem.LookupParameter("geom_exc")
-
-                            t = Transaction(doc, "Fix Vertical Reducer")
-                            t.Start()
+                            reducer_param = params.get("reducer_eccentric")
+                            geom_param = params.get("geom_exc")
 
                             if reducer_param and reducer_param.AsInteger() == 1:
                                 reducer_param.Set(0)
@@ -837,30 +1057,15 @@ class ElementEditorForm(Form):
                                 geom_param.Set(0)
                                 debug(" -> geom_exc turned OFF")
 
-                            t.Commit()
                             debug("✅ Fixed vertical reducer for:", eid)
                     except Exception as ve:
                         debug(
                             "❌ Error fixing vertical reducer for:", eid, "Error:", ve
                         )
 
-                # Re-read parameters from Revit
-                p_warn = elem.LookupParameter("waarschuwing")
-                warning_val = p_warn.AsString() if p_warn else ""
-                row.Cells["Warning"].Value = warning_val
-
-                p_bend = elem.LookupParameter("2x45°")
-                if p_bend and p_bend.StorageType == StorageType.Integer:
-                    bend45_val = "Yes" if p_bend.AsInteger() == 1 else "No"
-                    row.Cells["Bend45"].Value = bend45_val
             except:
                 continue
 
-        MessageBox.Show(
-            "✅ Reducers Fixed!\n\nUpdated: {}\nSkipped: {}".format(updated, skipped),
-            "Fix Reducers",
-        )
-
     def clear_placeholder(self, sender, event):
         if self.txtTextNoteCode.Text == "prefab 5.5.5":
             self.txtTextNoteCode.Text = ""
@@ -872,144 +1077,222 @@ class ElementEditorForm(Form):
             self.txtTextNoteCode.ForeColor = Color.Gray
 
     def bulkAddRemoveTags_Click(self, sender, event):
-        rows_to_process = []
-        for row in self.dataGrid.Rows:
-            cat = row.Cells["Category"].Value
-            if cat == "Pipes":
-                rows_to_process.append(row)
-
-        for row in rows_to_process:
-            val = row.Cells["TagStatus"].Value
-            host_id = int(str(row.Cells["Id"].Value))
+        ix = self._ix
+        ops = []
+        for row in self._rows_by_cat.get("Pipes", []):
+            val = row.Cells[ix["TagStatus"]].Value
+            if val == "Add/Place Tag":
+                ops.append(("add", row))
+            elif val == "Remove Tag":
+                ops.append(("remove", row))
+        self._apply_tag_ops(ops)
+
+    def _apply_tag_ops(self, ops):
+        """Add or remove the tags of pipe rows given as ("add"|"remove", row) pairs.
+
+        All deletions, then all creations, run in one transaction; the pipe
+        tags are indexed by host once, and only if something is removed. The
+        grid is only updated once the transaction group has been assimilated,
+        so a rollback leaves it matching the model.
+        """
+        if not ops:
+            return
+        ix = self._ix
+        removals = []
+        additions = []
+        for kind, row in ops:
+            host_id = row.Tag
             host = doc.GetElement(ElementId(host_id))
+            if not host:
+                continue
+            if kind == "remove":
+                removals.append((row, host))
+            else:
+                additions.append((row, host))
+
+        untagged_rows = []
+        tagged_rows = []
+        removed_tag_ids = []
+        new_tag_rows = []
+
+        tg = TransactionGroup(doc, "Add/Remove Tags")
+        tg.Start()
+        tr = Transaction(doc, "Bulk Tag Ops")
+        tr.Start()
+        self.dataGrid.SelectionChanged -= self.on_row_selected
+        try:
+            host_to_tag = collect_pipe_tags_by_host(doc.ActiveView) if removals else {}
+            for row, host in removals:
+                tag_elem_id = host_to_tag.pop(host.Id.IntegerValue, None)
+                if tag_elem_id is None:
+                    continue
+                doc.Delete(tag_elem_id)
+                untagged_rows.append(row)
+                removed_tag_ids.append(tag_elem_id.IntegerValue)
 
-            if val == "Add/Place Tag":
-                tr = Transaction(doc, "Add Tag")
-                tr.Start()
-                bb = host.get_BoundingBox(uidoc.ActiveView)
-                if bb:
-                    ctr = XYZ(
-                        (bb.Min.X + bb.Max.X) / 2.0,
-                        (bb.Min.Y + bb.Max.Y) / 2.0,
-                        (bb.Min.Z + bb.Max.Z) / 2.0,
-                    )
-                    ref = Reference(host)
-                    new_tag = IndependentTag.Create(
-                        doc,
-                        doc.ActiveView.Id,
-                        ref,
-                        True,
-                        TagMode.TM_ADDBY_CATEGORY,
-                        TagOrientation.Horizontal,
-                        ctr,
-                    )
-                tr.Commit()
-                row.Cells["TagStatus"].Value = "Remove Tag"
+            for row, host in additions:
+                center = get_center(host)
+                if not center:
+                    continue
+                new_tag = IndependentTag.Create(
+                    doc,
+                    doc.ActiveView.Id,
+                    Reference(host),
+                    True,
+                    TagMode.TM_ADDBY_CATEGORY,
+                    TagOrientation.Horizontal,
+                    XYZ(*center),
+                )
+                tagged_rows.append(row)
+
+                # Add new Pipe Tag row
                 te = doc.GetElement(new_tag.Id)
                 if te:
+                    com = host.LookupParameter("Comments")
                     data = {
                         "Id": str(te.Id),
                         "Category": "Pipe Tags",
                         "Name": te.Name or "",
-                        "DefaultCode": host.LookupParameter("Comments").AsString()
-                        or "",
-                        "NewCode": row.Cells["NewCode"].Value,
-                        "OutsideDiameter": row.Cells["OutsideDiameter"].Value,
-                        "Length": row.Cells["Length"].Value,
+                        "DefaultCode": (com.AsString() if com else "") or "",
+                        "NewCode": row.Cells[ix["NewCode"]].Value,
+                        "OutsideDiameter": row.Cells[ix["OutsideDiameter"]].Value,
+                        "Length": row.Cells[ix["Length"]].Value,
                         "Size": "",
                         "GEB_Article_Number": "",
                         "TagStatus": "Yes",
                     }
-                    self._add_row(data)
-
-            elif val == "Remove Tag":
-                host_eid = host.Id.IntegerValue
-                deleted_id = None
-                tag_elem_id = None
-                for t in (
-                    FilteredElementCollector(doc)
-                    .OfCategory(BuiltInCategory.OST_PipeTags)
-                    .WhereElementIsNotElementType()
-                    .ToElements()
-                ):
-                    tagged = (
-                        t.GetTaggedElementIds()
-                        if hasattr(t, "GetTaggedElementIds")
-                        else [t.TaggedElementId]
-                    )
-                    for rid in tagged:
-                        eid = (
-                            rid.HostElementId.IntegerValue
-                            if hasattr(rid, "HostElementId")
-                            else rid.IntegerValue
-                        )
-                        if eid == host_eid:
-                            deleted_id = t.Id.IntegerValue
-                            tag_elem_id = t.Id
-                            break
-                    if deleted_id:
-                        break
-                if deleted_id:
-                    self.dataGrid.SelectionChanged -= self.on_row_selected
-                    tr = Transaction(doc, "Remove Tag")
-                    tr.Start()
-                    doc.Delete(tag_elem_id)
-                    tr.Commit()
-                    row.Cells["TagStatus"].Value = "Add/Place Tag"
-                    row.Cells["TagStatus"].ReadOnly = False
-                    for i in range(self.dataGrid.Rows.Count):
-                        r2 = self.dataGrid.Rows[i]
-                        if (
-                            r2.Cells["Category"].Value == "Pipe Tags"
-                            and int(str(r2.Cells["Id"].Value)) == deleted_id
-                        ):
-                            self.dataGrid.Rows.RemoveAt(i)
-                            break
-                    self.dataGrid.SelectionChanged += self.on_row_selected
+                    new_tag_rows.append(data)
+            tr.Commit()
+            tg.Assimilate()
+        except:
+            if tr.GetStatus() == TransactionStatus.Started:
+                tr.RollBack()
+            tg.RollBack()
+            raise
+        else:
+            for row in untagged_rows:
+                row.Cells[ix["TagStatus"]].Value = "Add/Place Tag"
+                row.Cells[ix["TagStatus"]].ReadOnly = False
+            for tag_id in removed_tag_ids:
+                victim = self._row_by_id.get(tag_id)
+                if victim is not None:
+                    self._remove_row(victim)
+            for row in tagged_rows:
+                row.Cells[ix["TagStatus"]].Value = "Remove Tag"
+            for data in new_tag_rows:
+                self._add_row(data)
+        finally:
+            self.dataGrid.SelectionChanged += self.on_row_selected
 
     # Smart dynamic spacing
     def rearrange_buttons(self, sender, event):
+        # Resize fires on every pixel of a drag; only re-lay out on a new size
+        size = (self.buttonPanel.Width, self.buttonPanel.Height)
+        if getattr(self, "_last_button_panel_size", None) == size:
+            return
+        self._last_button_panel_size = size
+
         controls = list(self.buttonPanel.Controls)
         total_width = sum(c.Width for c in controls)
         available = self.buttonPanel.Width - total_width
         spacing = max(10, available // (len(controls) + 1))
         x = spacing
-        for ctrl in controls:
-            ctrl.Location = Point(x, (self.buttonPanel.Height - ctrl.Height) // 2)
-            x += ctrl.Width + spacing
+        self.buttonPanel.SuspendLayout()
+        try:
+            for ctrl in controls:
+                ctrl.Location = Point(x, (self.buttonPanel.Height - ctrl.Height) // 2)
+                x += ctrl.Width + spacing
+        finally:
+            self.buttonPanel.ResumeLayout(False)
+
+    def _delete_tag_rows(self, rows):
+        """Delete the tags of Pipe Tags rows in one transaction and drop the rows.
+
+        Each tag's host pipe row is switched back to "Add/Place Tag".
+        """
+        if not rows:
+            return
+        ix = self._ix
+        # sized up front: at most one tag id per row
+        tag_ids = List[ElementId](len(rows))
+        host_ids = []
+        for row in rows:
+            tag_id = ElementId(row.Tag)
+            tag_elem = doc.GetElement(tag_id)
+            host_id = None
+            if tag_elem:
+                tag_ids.Add(tag_id)
+                tagged = get_tagged_host_ids(tag_elem)
+                host_id = tagged[0] if tagged else None
+            host_ids.append(host_id)
+
+        if tag_ids.Count:
+            tr = Transaction(doc, "Remove Pipe-Tags")
+            tr.Start()
+            try:
+                doc.Delete(tag_ids)
+                tr.Commit()
+            except:
+                if tr.GetStatus() == TransactionStatus.Started:
+                    tr.RollBack()
+                raise
+
+        # rows only go once the tags are really gone
+        self.dataGrid.SelectionChanged -= self.on_row_selected
+        try:
+            for row, host_id in zip(rows, host_ids):
+                self._remove_row(row)
+                pr = self._row_by_id.get(host_id) if host_id else None
+                if pr is not None and pr.Cells[ix["Category"]].Value == "Pipes":
+                    pr.Cells[ix["TagStatus"]].Value = "Add/Place Tag"
+                    pr.Cells[ix["TagStatus"]].ReadOnly = False
+        finally:
+            self.dataGrid.SelectionChanged += self.on_row_selected
+
+    def _remove_row(self, row):
+        """Remove a grid row and drop it from the id and category lookups."""
+        self._row_by_id.pop(row.Tag, None)
+        cat_rows = self._rows_by_cat.get(row.Cells[self._ix["Category"]].Value)
+        if cat_rows and row in cat_rows:
+            cat_rows.remove(row)
+        self.dataGrid.Rows.Remove(row)
 
     def _add_row(self, data):
         """Helper to append a new DataGridView row from a dict."""
-        idx = self.dataGrid.Rows.Add()
-        row = self.dataGrid.Rows[idx]
+        ix = self._ix
+        # all values go in with the row, in column order
+        values = [None] * len(ix)
         for k, v in data.items():
-            row.Cells[k].Value = v
-
+            values[ix[k]] = v
         # Start with default
-        row.Cells["TagStatus"].Value = "Remove Tag"
-        row.Cells["TagStatus"].ReadOnly = True
+        values[ix["TagStatus"]] = "Remove Tag"
+        idx = self.dataGrid.Rows.Add(Array[object](values))
+        row = self.dataGrid.Rows[idx]
+        eid = int(data["Id"])
+        row.Tag = eid
+        self._row_by_id[row.Tag] = row
+        self._rows_by_cat[data.get("Category", "")].append(row)
+        row.Cells[ix["TagStatus"]].ReadOnly = True
 
         # Try to identify reducer buttons
         try:
             cat = data.get("Category", "")
-            eid = int(data.get("Id", "0"))
-            elem = doc.GetElement(ElementId(eid))
 
-            if cat == "Pipe Fittings" and isinstance(elem, FamilyInstance):
-                fam_name = elem.Symbol.Family.Name.lower()
+            if cat == "Pipe Fittings" and eid in self.fittingFamilyNames:
+                fam_name = self.fittingFamilyNames[eid]
                 debug("✅ Family name:", fam_name)
 
                 if "multireducer_geb" in fam_name:
-                    row.Cells["TagStatus"].Value = "Flip Reducer"
-                    row.Cells["TagStatus"].ReadOnly = False
+                    row.Cells[ix["TagStatus"]].Value = "Flip Reducer"
+                    row.Cells[ix["TagStatus"]].ReadOnly = False
 
                 elif "multibocht" in fam_name:
-                    row.Cells["TagStatus"].Value = "Flip 2x45°"
-                    row.Cells["TagStatus"].ReadOnly = False
+                    row.Cells[ix["TagStatus"]].Value = "Flip 2x45°"
+                    row.Cells[ix["TagStatus"]].ReadOnly = False
 
                 elif "liggend" in fam_name:
-                    row.Cells["TagStatus"].Value = "Flip T-stuk"
-                    row.Cells["TagStatus"].ReadOnly = False
+                    row.Cells[ix["TagStatus"]].Value = "Flip T-stuk"
+                    row.Cells[ix["TagStatus"]].ReadOnly = False
 
         except Exception as ex:
             debug("⚠️ Error resolving Flip button logic:", ex)
@@ -1042,9 +1325,10 @@ class ElementEditorForm(Form):
         ttn.Commit()
 
     def autoFillPipeTagCodes(self, sender, event):
+        ix = self._ix
         # 1) Parse base
         raw = self.txtTextNoteCode.Text.strip()
-        m = re.search(r"([\d\.]+)", raw)
+        m = BASE_CODE_RE.search(raw)
         if not m:
             MessageBox.Show("Could not parse base code from text note.", "Error")
             return
@@ -1061,52 +1345,44 @@ class ElementEditorForm(Form):
         else:
             prefix, base_n = base, 0
 
-        # 2) Collect indices
-        fit_rows, pipe_rows, tag_rows = [], [], []
-        for i in range(self.dataGrid.Rows.Count):
-            cat = self.dataGrid.Rows[i].Cells["Category"].Value
-            if cat == "Pipe Fittings":
-                fit_rows.append(i)
-            elif cat == "Pipes":
-                pipe_rows.append(i)
-            elif cat == "Pipe Tags":
-                tag_rows.append(i)
-
-        # Override all Pipe Fittings rows to the base code
-        for idx in fit_rows:
-            self.dataGrid.Rows[idx].Cells["NewCode"].Value = base
+        # 2) Rows per category, kept up to date since populate
+        fit_rows = self._rows_by_cat.get("Pipe Fittings", [])
+        pipe_rows = self._rows_by_cat.get("Pipes", [])
+        tag_rows = self._rows_by_cat.get("Pipe Tags", [])
 
-        # 5) Pipes sorted and numbered: full base + .1,.2...
+        # 5) Pipes sorted left-to-right, bottom-to-up on an (x, y) key;
+        # only the grid's own pipes are measured, not every pipe in the view
         pipe_centers = []
-        for idx in pipe_rows:
-            rid = int(str(self.dataGrid.Rows[idx].Cells["Id"].Value))
-            elem = doc.GetElement(ElementId(rid))
-            bbox = elem.get_BoundingBox(uidoc.ActiveView)
-            if bbox:
-                ctr = XYZ(
-                    (bbox.Min.X + bbox.Max.X) * 0.5,
-                    (bbox.Min.Y + bbox.Max.Y) * 0.5,
-                    (bbox.Min.Z + bbox.Max.Z) * 0.5,
-                )
-            else:
-                ctr = XYZ(0, 0, 0)
-            pipe_centers.append((idx, ctr))
-
-        pipe_centers.sort(key=lambda x: (x[1].X, x[1].Y))
-        for i, (idx, _) in enumerate(pipe_centers, 1):
-            self.dataGrid.Rows[idx].Cells["NewCode"].Value = "{}.{}".format(base, i)
-
-        # 6) Mirror pipe numbering onto pipe‐tag rows (same count)
-        for i, _ in enumerate(pipe_centers, 1):
-            if i - 1 < len(tag_rows):
-                trow = tag_rows[i - 1]
-                self.dataGrid.Rows[trow].Cells["NewCode"].Value = "{}.{}".format(
-                    base, i
-                )
+        for row in pipe_rows:
+            pipe = doc.GetElement(ElementId(row.Tag))
+            center = get_center(pipe) if pipe else None
+            pipe_centers.append((row, center[:2] if center else (0.0, 0.0)))
+        pipe_centers.sort(key=itemgetter(1))
+
+        # hold off repaint, layout and Revit selection sync while writing codes
+        code_ix = ix["NewCode"]
+        self.dataGrid.SelectionChanged -= self.on_row_selected
+        self.dataGrid.SuspendLayout()
+        try:
+            # Override all Pipe Fittings rows to the base code
+            for row in fit_rows:
+                row.Cells[code_ix].Value = base
+
+            # Pipes numbered: full base + .1,.2...
+            base_dot = base + "."
+            for i, (row, _) in enumerate(pipe_centers, 1):
+                row.Cells[code_ix].Value = base_dot + str(i)
+
+            # 6) Mirror pipe numbering onto pipe‐tag rows (same count)
+            for i, row in enumerate(tag_rows[: len(pipe_centers)], 1):
+                row.Cells[code_ix].Value = base_dot + str(i)
+        finally:
+            self.dataGrid.ResumeLayout()
+            self.dataGrid.SelectionChanged += self.on_row_selected
 
     def dataGrid_CellContentClick(self, sender, e):
-        col = self.dataGrid.Columns[e.ColumnIndex].Name
-        if col != "TagStatus":
+        ix = self._ix
+        if e.ColumnIndex != ix["TagStatus"]:
             return
 
         # Always include the clicked row
@@ -1116,14 +1392,18 @@ class ElementEditorForm(Form):
 
         # Build selected rows list from indexes
         selected_rows = [self.dataGrid.Rows[i] for i in selected_indexes]
+        # pipe tag adds/removes and Pipe Tags rows to delete, applied together
+        # once the selection is walked
+        tag_ops = []
+        tag_rows = []
 
         for row in selected_rows:
-            cat = row.Cells["Category"].Value
-            val = row.Cells["TagStatus"].Value
+            cat = row.Cells[ix["Category"]].Value
+            val = row.Cells[ix["TagStatus"]].Value
 
             if cat == "Pipe Fittings" and val == "Flip T-stuk":
                 try:
-                    host_id = int(str(row.Cells["Id"].Value))
+                    host_id = row.Tag
                     elem = doc.GetElement(ElementId(host_id))
                     if elem:
                         p = elem.LookupParameter("switch_excentriciteit")
@@ -1134,15 +1414,17 @@ class ElementEditorForm(Form):
                             p.Set(0 if current == 1 else 1)
                             t.Commit()
                             debug(
-                                "🔄 Flipped T-stuk (switch_excentriciteit = %s): %s"
-                                % (str(not current), str(elem.Id))
+                                "🔄 Flipped T-stuk, switch_excentriciteit =",
+                                not current,
+                                "for:",
+                                elem.Id,
                             )
                 except Exception as ex:
                     debug("❌ Failed to flip T-stuk using switch_excentriciteit:", ex)
 
             elif cat == "Pipe Fittings" and val == "Flip 2x45°":
                 try:
-                    host_id = int(str(row.Cells["Id"].Value))
+                    host_id = row.Tag
                     elem = doc.GetElement(ElementId(host_id))
                     if elem:
                         param = elem.LookupParameter("2x45°")
@@ -1155,9 +1437,9 @@ class ElementEditorForm(Form):
                             t.Commit()
 
                             if current_val == 1:
-                                row.Cells["Bend45"].Value = "No"
+                                row.Cells[ix["Bend45"]].Value = "No"
                             else:
-                                row.Cells["Bend45"].Value = "Yes"
+                                row.Cells[ix["Bend45"]].Value = "Yes"
 
                             debug(
                                 "✅ Toggled 2x45° to",
@@ -1176,12 +1458,12 @@ class ElementEditorForm(Form):
 
             elif cat == "Pipe Fittings" and val == "Flip Reducer":
                 try:
-                    host_id = int(str(row.Cells["Id"].Value))
+                    host_id = row.Tag
                     elem = doc.GetElement(ElementId(host_id))
 
                     if elem and isinstance(elem, FamilyInstance):
-                        name = row.Cells["Name"].Value or ""
-                        family_name = elem.Symbol.Family.Name.lower()
+                        name = row.Cells[ix["Name"]].Value or ""
+                        family_name = self.fittingFamilyNames.get(host_id, "")
 
                         if "multireducer_geb" in family_name:
                             reducer_param = elem.LookupParameter("reducer_eccentric")
@@ -1209,152 +1491,40 @@ class ElementEditorForm(Form):
             # ADD/REMOVE TAG (Pipes)
             # ----------------------
             elif cat == "Pipes":
-                host_id = int(str(row.Cells["Id"].Value))
-                host = doc.GetElement(ElementId(host_id))
-
                 if val == "Add/Place Tag":
-                    tr = Transaction(doc, "Add Tag")
-                    tr.Start()
-                    bb = host.get_BoundingBox(uidoc.ActiveView)
-                    if bb:
-                        ctr = XYZ(
-                            (bb.Min.X + bb.Max.X) / 2.0,
-                            (bb.Min.Y + bb.Max.Y) / 2.0,
-                            (bb.Min.Z + bb.Max.Z) / 2.0,
-                        )
-                        ref = Reference(host)
-                        new_tag = IndependentTag.Create(
-                            doc,
-                            doc.ActiveView.Id,
-                            ref,
-                            True,
-                            TagMode.TM_ADDBY_CATEGORY,
-                            TagOrientation.Horizontal,
-                            ctr,
-                        )
-                    tr.Commit()
-
-                    row.Cells["TagStatus"].Value = "Remove Tag"
-
-                    # Add new Pipe Tag row
-                    te = doc.GetElement(new_tag.Id)
-                    if te:
-                        data = {
-                            "Id": str(te.Id),
-                            "Category": "Pipe Tags",
-                            "Name": te.Name or "",
-                            "DefaultCode": host.LookupParameter("Comments").AsString()
-                            or "",
-                            "NewCode": row.Cells["NewCode"].Value,
-                            "OutsideDiameter": row.Cells["OutsideDiameter"].Value,
-                            "Length": row.Cells["Length"].Value,
-                            "Size": "",
-                            "GEB_Article_Number": "",
-                            "TagStatus": "Yes",
-                        }
-                        self._add_row(data)
-
+                    tag_ops.append(("add", row))
                 elif val == "Remove Tag":
-                    host_eid = host.Id.IntegerValue
-                    deleted_id = None
-                    tag_elem_id = None
-                    for t in (
-                        FilteredElementCollector(doc)
-                        .OfCategory(BuiltInCategory.OST_PipeTags)
-                        .WhereElementIsNotElementType()
-                        .ToElements()
-                    ):
-                        tagged = (
-                            t.GetTaggedElementIds()
-                            if hasattr(t, "GetTaggedElementIds")
-                            else [t.TaggedElementId]
-                        )
-                        for rid in tagged:
-                            eid = (
-                                rid.HostElementId.IntegerValue
-                                if hasattr(rid, "HostElementId")
-                                else rid.IntegerValue
-                            )
-                            if eid == host_eid:
-                                deleted_id = t.Id.IntegerValue
-                                tag_elem_id = t.Id
-                                break
-                        if deleted_id:
-                            break
-                    if deleted_id:
-                        self.dataGrid.SelectionChanged -= self.on_row_selected
-                        tr = Transaction(doc, "Remove Tag")
-                        tr.Start()
-                        doc.Delete(tag_elem_id)
-                        tr.Commit()
-                        row.Cells["TagStatus"].Value = "Add/Place Tag"
-                        row.Cells["TagStatus"].ReadOnly = False
-                        for i in range(self.dataGrid.Rows.Count):
-                            r2 = self.dataGrid.Rows[i]
-                            if (
-                                r2.Cells["Category"].Value == "Pipe Tags"
-                                and int(str(r2.Cells["Id"].Value)) == deleted_id
-                            ):
-                                self.dataGrid.Rows.RemoveAt(i)
-                                break
-                        self.dataGrid.SelectionChanged += self.on_row_selected
+                    tag_ops.append(("remove", row))
 
             # --------------------------
             # REMOVE TAG (Pipe Tags)
             # --------------------------
             elif cat == "Pipe Tags" and val == "Remove Tag":
-                tag_id = ElementId(int(str(row.Cells["Id"].Value)))
-                self.dataGrid.SelectionChanged -= self.on_row_selected
-                try:
-                    tag_elem = doc.GetElement(tag_id)
-                    host_id = None
-                    if tag_elem:
-                        ids = (
-                            tag_elem.GetTaggedElementIds()
-                            if hasattr(tag_elem, "GetTaggedElementIds")
-                            else [tag_elem.TaggedElementId]
-                        )
-                        if ids and len(ids):
-                            rid = ids[0]
-                            host_id = (
-                                rid.HostElementId.IntegerValue
-                                if hasattr(rid, "HostElementId")
-                                else rid.IntegerValue
-                            )
-
-                    tr = Transaction(doc, "Remove Pipe-Tag")
-                    tr.Start()
-                    doc.Delete(tag_id)
-                    tr.Commit()
+                tag_rows.append(row)
 
-                    self.dataGrid.Rows.RemoveAt(row.Index)
-
-                    if host_id:
-                        for i in range(self.dataGrid.Rows.Count):
-                            pr = self.dataGrid.Rows[i]
-                            if (
-                                int(str(pr.Cells["Id"].Value)) == host_id
-                                and pr.Cells["Category"].Value == "Pipes"
-                            ):
-                                pr.Cells["TagStatus"].Value = "Add/Place Tag"
-                                pr.Cells["TagStatus"].ReadOnly = False
-                                break
-                finally:
-                    self.dataGrid.SelectionChanged += self.on_row_selected
+        self._delete_tag_rows(tag_rows)
+        self._apply_tag_ops(tag_ops)
 
     def okButton_Click(self, sender, event):
+        # (key, column index) pairs, resolved once for all rows
+        fields = [
+            (name, self._ix[name])
+            for name in (
+                "Category",
+                "Name",
+                "DefaultCode",
+                "NewCode",
+                "OutsideDiameter",
+                "Length",
+                "TagStatus",
+            )
+        ]
         updated_data = []
-        for row in self.dataGrid.Rows:
-            entry = {
-                "Id": row.Cells["Id"].Value,
-                "Category": row.Cells["Category"].Value,
-                "Name": row.Cells["Name"].Value,
-                "DefaultCode": row.Cells["DefaultCode"].Value,
-                "NewCode": row.Cells["NewCode"].Value,
-                "OutsideDiameter": row.Cells["OutsideDiameter"].Value,
-                "Length": row.Cells["Length"].Value,
-                "TagStatus": row.Cells["TagStatus"].Value,
-            }
+        for row in list(self.dataGrid.Rows):
+            cells = row.Cells
+            entry = {name: cells[i].Value for name, i in fields}
+            # integer element id (None for the new-row placeholder)
+            entry["Id"] = row.Tag
             updated_data.append(entry)
 
         self.Result = {
@@ -1370,24 +1540,27 @@ class ElementEditorForm(Form):
         row = self.dataGrid.CurrentRow
         if not row:
             return
-        id_val = row.Cells["Id"].Value
+        id_val = row.Tag
         if not id_val:
             return
 
-        # try to parse and highlight, but swallow any invalid-object errors
-        try:
-            eid = ElementId(int(str(id_val)))
-            elem = doc.GetElement(eid)
-            # guard against deleted/invalid elements
-            if elem and elem.IsValidObject:
-                uidoc.Selection.SetElementIds(List[ElementId]([eid]))
-        except:
-            return
+        eid = self._eid_cache.get(id_val)
+        if eid is None:
+            eid = self._eid_cache[id_val] = ElementId(id_val)
+        elem = doc.GetElement(eid)
+        # guard against deleted/invalid elements
+        if elem is not None and elem.IsValidObject:
+            self._selection_ids.Clear()
+            self._selection_ids.Add(eid)
+            uidoc.Selection.SetElementIds(self._selection_ids)
 
 
 def show_element_editor(elements_data, region_elements=None):
     form = ElementEditorForm(elements_data, region_elements)
-    if form.ShowDialog() == DialogResult.OK:
+    dialog_result = form.ShowDialog()
+    # the editor can move, flip or delete elements; cached boxes are stale now
+    clear_geometry_caches()
+    if dialog_result == DialogResult.OK:
         return form.Result
     return None
 
@@ -1395,187 +1568,214 @@ def show_element_editor(elements_data, region_elements=None):
 # ==================================================
 # Filter Gathered Elements to Relevant Categories
 # ==================================================
+
+
 def filter_relevant_elements(gathered_elements):
     """
     Build a list of dicts with keys:
-     "Id","Category","Name","DefaultCode","NewCode",
+     "Id","IdInt","Category","Name","DefaultCode","NewCode",
      "OutsideDiameter","Length","GEB_Article_Number","TagStatus"
+    plus "_comments_param", the element's Comments Parameter (if read)
     """
     relevant = []
 
-    pipe_ids = {
-        e.Id.IntegerValue
+    # pipe id -> pipe element, so region-tag hosts need no GetElement
+    pipes_by_id = {
+        e.Id.IntegerValue: e
         for e in gathered_elements
         if e.Category and e.Category.Name == "Pipes"
     }
     # grab all tags in the view
     all_pipe_tags = (
-        FilteredElementCollector(doc)
+        FilteredElementCollector(doc, uidoc.ActiveView.Id)
         .OfCategory(BuiltInCategory.OST_PipeTags)
         .WhereElementIsNotElementType()
-        .ToElements()
     )
 
-    # pull in any tags whose host pipe was in our region
+    # one pass over the tags: host id -> tags, and the tags whose (first)
+    # host pipe was in our region
+    host_to_tags = defaultdict(list)
+    region_tags = []
     for tag in all_pipe_tags:
         try:
-            host = None
-            if hasattr(tag, "GetTaggedElementIds"):
-                ids = tag.GetTaggedElementIds()
-                if ids and ids.Count > 0:
-                    host = doc.GetElement(ids[0])
-            elif hasattr(tag, "TaggedElementId"):
-                host = doc.GetElement(tag.TaggedElementId)
-            if host and host.Id.IntegerValue in pipe_ids:
-                # and only if we haven't already added it in gathered_elements
-                if not any(str(tag.Id) == d["Id"] for d in relevant):
-                    warning_val = ""
-                    bend45_val = ""
-                    # build your dict exactly like you do for pipe‑tags below
-                    relevant.append(
-                        {
-                            "Id": str(tag.Id),
-                            "Category": "Pipe Tags",
-                            "Name": tag.Name or "",
-                            "Warning": "",
-                            "Bend45": "",
-                            "DefaultCode": host.LookupParameter("Comments").AsString()
-                            or "",
-                            "NewCode": host.LookupParameter("Comments").AsString()
-                            or "",
-                            "OutsideDiameter": convert_param_to_string(
-                                host.LookupParameter("Outside Diameter")
-                            ),
-                            "Length": convert_param_to_string(
-                                host.LookupParameter("Length")
-                            ),
-                            "Size": "",  # if you want
-                            "GEB_Article_Number": "",
-                            "TagStatus": "Yes",
-                        }
-                    )
+            host_ids = get_tagged_host_ids(tag)
+        except:
+            continue
+        for host_id in host_ids:
+            host_to_tags[host_id].append(tag)
+        if host_ids and host_ids[0] in pipes_by_id:
+            region_tags.append((tag, host_ids[0]))
+
+    # host id -> (comments, outside diameter, length); a pipe and all of its
+    # tags show the same values, so each host is read once
+    host_values = {}
+
+    def get_host_values(host):
+        key = host.Id.IntegerValue
+        values = host_values.get(key)
+        if values is None:
+            com = get_param(host, "Comments")
+            values = (
+                (com.AsString() if com else "") or "",
+                convert_param_to_string(get_param(host, "Outside Diameter")),
+                convert_param_to_string(get_param(host, "Length")),
+            )
+            host_values[key] = values
+        return values
+
+    # pull in any tags whose host pipe was in our region
+    relevant_ids = set()
+    for tag, host_id in region_tags:
+        try:
+            tag_id = str(tag.Id)
+            # and only if we haven't already added it
+            if tag_id in relevant_ids:
+                continue
+            host = pipes_by_id[host_id]
+            comments, outside_diam, length_val = get_host_values(host)
+            # build your dict exactly like you do for pipe‑tags below
+            relevant.append(
+                {
+                    "Id": tag_id,
+                    "IdInt": tag.Id.IntegerValue,
+                    "Category": "Pipe Tags",
+                    "Name": tag.Name or "",
+                    "Warning": "",
+                    "Bend45": "",
+                    "DefaultCode": comments,
+                    "NewCode": comments,
+                    "OutsideDiameter": outside_diam,
+                    "Length": length_val,
+                    "Size": "",  # if you want
+                    "GEB_Article_Number": "",
+                    "TagStatus": "Yes",
+                }
+            )
+            relevant_ids.add(tag_id)
         except:
             pass
 
+    # fitting type id -> which of DIAMETER_PARAM_NAMES it carries (or None)
+    diameter_name_by_type = {}
+
+    # split the gathered elements by category once, so each category gets
+    # its own loop instead of re-testing the category of every element
+    buckets = {"Pipes": [], "Pipe Fittings": [], "Pipe Tags": [], "Text Notes": []}
     for e in gathered_elements:
         if not e.Category:
             continue
-        cat = e.Category.Name
-        if cat not in ("Pipes", "Pipe Fittings", "Pipe Tags", "Text Notes"):
-            continue
+        # other categories only count towards the region extents
+        bucket = buckets.get(e.Category.Name)
+        if bucket is not None:
+            bucket.append(e)
+
+    def add_row(e, cat, **values):
+        com = get_param(e, "Comments")
+        default_code = (com.AsString() if com else "") or ""
+        row_id = str(e.Id)
+        relevant_ids.add(row_id)
+        relevant.append(
+            {
+                "Id": row_id,
+                "IdInt": e.Id.IntegerValue,
+                "Category": cat,
+                "Name": e.Name if hasattr(e, "Name") else "",
+                "Warning": values.get("warning_val", ""),
+                "Bend45": values.get("bend45_val", ""),
+                "DefaultCode": default_code,
+                "NewCode": default_code,
+                "OutsideDiameter": values.get("outside_diam", ""),
+                "Length": values.get("length_val", ""),
+                "Size": values.get("size_val", ""),
+                "GEB_Article_Number": values.get("art_num", ""),
+                "TagStatus": values.get("tag_status", ""),
+                # kept for the final Comments update
+                "_comments_param": com,
+            }
+        )
 
-        com = e.LookupParameter("Comments")
-        default_code = com.AsString() if com and com.AsString() else ""
+    # --- Pipes ---
+    for e in buckets["Pipes"]:
+        _, outside_diam, length_val = get_host_values(e)
+        add_row(
+            e,
+            "Pipes",
+            outside_diam=outside_diam,
+            length_val=length_val,
+            # detect existing tags
+            tag_status="Yes" if e.Id.IntegerValue in host_to_tags else "No",
+        )
 
-        # initialize
-        warning_val = ""
+    # --- Pipe Fittings ---
+    for e in buckets["Pipe Fittings"]:
+        p_warn = get_param(e, "waarschuwing")
+        warning_val = p_warn.AsString() if p_warn else ""
+
+        p_bend = get_param(e, "2x45°")
         bend45_val = ""
+        if p_bend and p_bend.StorageType == StorageType.Integer:
+            bend45_val = "Yes" if p_bend.AsInteger() == 1 else "No"
+        # diameter (try several names, once per type)
         outside_diam = ""
-        length_val = ""
-        art_num = ""
-        tag_status = ""
-        size_val = ""
-
-        # --- Pipes ---
-        if cat == "Pipes":
-            odp = e.LookupParameter("Outside Diameter")
-            lp = e.LookupParameter("Length")
-            outside_diam = convert_param_to_string(odp)
-            length_val = convert_param_to_string(lp)
-
-            # detect existing tags
-            tag_status = "No"
-            for tag in all_pipe_tags:
-                try:
-                    tagged_ids = []
-                    if hasattr(tag, "GetTaggedElementIds"):
-                        tagged_ids = tag.GetTaggedElementIds()
-                    elif hasattr(tag, "TaggedElementId"):
-                        tagged_ids = [tag.TaggedElementId]
-                    for tid in tagged_ids:
-                        if tid and tid.IntegerValue == e.Id.IntegerValue:
-                            tag_status = "Yes"
-                            break
-                    if tag_status == "Yes":
-                        break
-                except:
-                    pass
-
-        # --- Pipe Fittings ---
-        elif cat == "Pipe Fittings":
-            p_warn = e.LookupParameter("waarschuwing")
-            warning_val = p_warn.AsString() if p_warn else ""
-
-            p_bend = e.LookupParameter("2x45°")
-            bend45_val = ""
-            if p_bend and p_bend.StorageType == StorageType.Integer:
-                bend45_val = "Yes" if p_bend.AsInteger() == 1 else "No"
-            # diameter (try several names)
-            for pname in ("Outside Diameter", "Diameter", "Nominal Diameter"):
-                p = e.LookupParameter(pname)
-                if p:
-                    outside_diam = convert_param_to_string(p)
-                    break
-            # length
-            lp = e.LookupParameter("Length")
-            length_val = convert_param_to_string(lp)
-            # GEB article
-            ap = e.LookupParameter("GEB_Article_Number")
-            art_num = ap.AsString() if ap and ap.AsString() else ""
+        p = get_diameter_param(e, diameter_name_by_type)
+        if p:
+            outside_diam = convert_param_to_string(p)
+        # length
+        lp = get_param(e, "Length")
+        length_val = convert_param_to_string(lp)
+        # GEB article
+        ap = get_param(e, "GEB_Article_Number")
+        art_num = (ap.AsString() if ap else "") or ""
 
+        size_val = ""
+        param_size = get_param(e, "Size")
+        if param_size:
+            size_val = convert_param_to_string(param_size)
+
+        add_row(
+            e,
+            "Pipe Fittings",
+            warning_val=warning_val,
+            bend45_val=bend45_val,
+            outside_diam=outside_diam,
+            length_val=length_val,
+            size_val=size_val,
+            art_num=art_num,
             # only the specific fitting gets Add/Place Tag
-            if e.Name and e.Name.find("DN") >= 0:
-                tag_status = "No"
-            else:
-                tag_status = ""
+            tag_status="No" if e.Name and e.Name.find("DN") >= 0 else "",
+        )
 
-        # --- Pipe Tags ---
-        elif cat == "Pipe Tags":
-            tag_status = "Yes"
+    # --- Pipe Tags ---
+    for e in buckets["Pipe Tags"]:
+        # already pulled in above through its host pipe
+        if str(e.Id) in relevant_ids:
+            continue
+        host = None
+        try:
+            host_ids = get_tagged_host_ids(e)
+            if host_ids:
+                host = pipes_by_id.get(host_ids[0]) or doc.GetElement(
+                    ElementId(host_ids[0])
+                )
+        except:
             host = None
-            try:
-                if hasattr(e, "GetTaggedElementIds"):
-                    ids = e.GetTaggedElementIds()
-                    if ids and ids.Count > 0:
-                        host = doc.GetElement(ids[0])
-                if not host and hasattr(e, "TaggedElementId"):
-                    host = doc.GetElement(e.TaggedElementId)
-            except:
-                host = None
-
-            if host:
-                odp = host.LookupParameter("Outside Diameter")
-                lp = host.LookupParameter("Length")
-                outside_diam = convert_param_to_string(odp)
-                length_val = convert_param_to_string(lp)
 
-        # --- Text Notes & others ---
-        else:
-            tag_status = ""
-
-        size_val = ""
-        if cat == "Pipe Fittings":
-            param_size = e.LookupParameter("Size")
-            if param_size:
-                size_val = convert_param_to_string(param_size)
-
-        relevant.append(
-            {
-                "Id": str(e.Id),
-                "Category": cat,
-                "Name": e.Name if hasattr(e, "Name") else "",
-                "Warning": warning_val,
-                "Bend45": bend45_val,
-                "DefaultCode": default_code,
-                "NewCode": default_code,
-                "OutsideDiameter": outside_diam,
-                "Length": length_val,
-                "Size": size_val,
-                "GEB_Article_Number": art_num,
-                "TagStatus": tag_status,
-            }
+        outside_diam = ""
+        length_val = ""
+        if host:
+            _, outside_diam, length_val = get_host_values(host)
+        add_row(
+            e,
+            "Pipe Tags",
+            outside_diam=outside_diam,
+            length_val=length_val,
+            tag_status="Yes",
         )
 
+    # --- Text Notes ---
+    for e in buckets["Text Notes"]:
+        add_row(e, "Text Notes")
+
     return relevant
 
 
@@ -1606,23 +1806,18 @@ for eData in result["Elements"]:
 # --- Renumber Pipes based on region order (sorted left-to-right, bottom-to-up) ---
 if not result.get("TextNotePlaced", False):
     base_raw = result.get("TextNote", "").strip()
-    m = re.search(r"([\d\.]+)", base_raw)
+    m = BASE_CODE_RE.search(base_raw)
     base = m.group(1) if m else "0"
 
+    # the caches were cleared after the dialog; only the region's pipes are measured
     pipe_entries = []
     for idx, eData in enumerate(result["Elements"]):
         if eData["Category"] == "Pipes":
-            elem = doc.GetElement(ElementId(int(str(eData["Id"]))))
-            if elem:
-                bbox = elem.get_BoundingBox(uidoc.ActiveView)
-                if bbox:
-                    center = XYZ(
-                        (bbox.Min.X + bbox.Max.X) / 2.0,
-                        (bbox.Min.Y + bbox.Max.Y) / 2.0,
-                        (bbox.Min.Z + bbox.Max.Z) / 2.0,
-                    )
-                    pipe_entries.append((idx, center))
-    pipe_entries.sort(key=lambda x: (x[1].X, x[1].Y))
+            pipe = doc.GetElement(ElementId(eData["Id"]))
+            center = get_center(pipe) if pipe else None
+            if center:
+                pipe_entries.append((idx, center[:2]))
+    pipe_entries.sort(key=itemgetter(1))
 
     ctr = 1
     for i, _ in pipe_entries:
@@ -1634,22 +1829,32 @@ if not result.get("TextNotePlaced", False):
             eData["NewCode"] = base
 
 # --- Update the elements' "Comments" from the DataGridView ---
+# element id -> Comments Parameter, as already read by the filter pass
+comments_params = {
+    d["IdInt"]: d["_comments_param"]
+    for d in filtered_elements
+    if d.get("_comments_param") is not None
+}
+
 t = Transaction(doc, "Update Comments")
 t.Start()
 for eData in result["Elements"]:
-    # skip rows where Id is missing or not an integer
-    id_val = eData.get("Id")
-    try:
-        eid = int(str(id_val))
-    except (TypeError, ValueError):
+    # the dialog hands back integer ids; skip rows without one
+    eid = eData.get("Id")
+    if eid is None:
         continue
 
-    elem = doc.GetElement(ElementId(eid))
-    if not elem:
-        continue
-    # get the Comments parameter
-    p = elem.LookupParameter("Comments")
-    if not p or p.IsReadOnly:
+    # get the Comments parameter (look it up for rows the filter did not
+    # read, e.g. tags placed from the dialog)
+    p = comments_params.get(eid)
+    if p is None:
+        elem = doc.GetElement(ElementId(eid))
+        p = get_param(elem, "Comments") if elem else None
+    try:
+        if not p or p.IsReadOnly:
+            continue
+    except Exception:
+        # the cached parameter's element was deleted in the dialog
         continue
 
     # if this is a fitting, force it to the base sheet code
@@ -1661,9 +1866,11 @@ for eData in result["Elements"]:
         p.Set(str(eData["NewCode"]))
 t.Commit()
 
+# region extents, shared by the text note, the plan crop and the 3D section box
+region_min, region_max = get_region_bounding_box(gathered_elements)
+
 # --- Place the text note if not already placed ---
 if not result.get("TextNotePlaced", False):
-    (region_min, region_max) = get_region_bounding_box(gathered_elements)
     view = doc.ActiveView
     corner = region_min
     ttn = Transaction(doc, "Place Text Note at Region Corner")
@@ -1676,8 +1883,6 @@ if not result.get("TextNotePlaced", False):
         )
     ttn.Commit()
 
-region_min, region_max = get_region_bounding_box(gathered_elements)
-
 orig = uidoc.ActiveView
 if orig.ViewType != ViewType.FloorPlan:
     MessageBox.Show("Active view is not a Floor Plan!", "Error")
@@ -1702,7 +1907,7 @@ new_view.Discipline = ViewDiscipline.Coordination
 new_view.Scale = 25
 
 # naming, cropping, discipline etc...
-m = re.search(r"([\d\.]+)", result["TextNote"])
+m = BASE_CODE_RE.search(result["TextNote"])
 base = m.group(1) if m else result["TextNote"].strip()  # "5.1.1"
 try:
     new_view.Name = base
@@ -1792,8 +1997,9 @@ class TBPicker(Form):
         self.CancelButton = ca
 
 
-existing_sheets = FilteredElementCollector(doc).OfClass(ViewSheet).ToElements()
-existing_numbers = {s.SheetNumber for s in existing_sheets}
+existing_numbers = {
+    s.SheetNumber for s in FilteredElementCollector(doc).OfClass(ViewSheet)
+}
 
 # show the picker
 picker = TBPicker(all_tbs)
@@ -1807,9 +2013,16 @@ title_block = all_tbs[picker.lb.SelectedIndex]
 # 3) Create A3 sheets, skipping duplicates
 # ————————————————————————————————
 
-# b) for each base, only create if it’s not already on a sheet
-for base in {base}:  # e.g. 5.1.1
-    if base in existing_numbers:
+
+def create_sheet_for_base(base, ctx):
+    """
+    Create sheet `base` (e.g. "5.1.1") holding the plan view and an isometric
+    3D callout, and return (sheet, title-block center). `ctx` carries the
+    values shared by every sheet: existing_numbers, title_block, plan_view,
+    region_min/region_max, v3d_type, view3d_names and view3d_template.
+    """
+    # only create if it’s not already on a sheet
+    if base in ctx["existing_numbers"]:
         MessageBox.Show(
             "Sheet 'prefab {0}' already exists!\n\n"
             "Please pick a different code in the text-note editor.".format(base),
@@ -1818,17 +2031,18 @@ for base in {base}:  # e.g. 5.1.1
         sys.exit("Duplicate sheet number")
     t3 = Transaction(doc, "Create 3D callout")
     t3.Start()
+    title_block = ctx["title_block"]
     sheet = ViewSheet.Create(doc, title_block.Id)
     sheet.SheetNumber = base
     sheet.Name = "Prefab " + base
+    # keep the shared set current, so further bases need no re-collection
+    ctx["existing_numbers"].add(base)
 
     # Get placed title block instance and its bounding box
     titleblock_inst = next(
         (
             e
-            for e in FilteredElementCollector(doc, sheet.Id)
-            .OfClass(FamilyInstance)
-            .ToElements()
+            for e in FilteredElementCollector(doc, sheet.Id).OfClass(FamilyInstance)
             if e.Symbol.Id == title_block.Id
         ),
         None,
@@ -1847,18 +2061,14 @@ for base in {base}:  # e.g. 5.1.1
     )
 
     # Place the main floor plan view centered in title block region
-    Viewport.Create(doc, sheet.Id, new_view.Id, tb_center)
+    Viewport.Create(doc, sheet.Id, ctx["plan_view"].Id, tb_center)
 
     # ------------------------------------------
     # 4) Create & place 3D callout
     # ------------------------------------------
-    all3ds = FilteredElementCollector(doc).OfClass(ViewFamilyType).ToElements()
-    all3d_views = FilteredElementCollector(doc).OfClass(View3D).ToElements()
-    # 1. pick a 3D ViewFamilyType
+    # 1. number the callout after the earlier sheet views of this base
     prefix = "{} - Sheet".format(base)
-    existing_count = sum(1 for v in all3d_views if v.Name.startswith(prefix))
-
-    v3d_type = next(v for v in all3ds if v.ViewFamily == ViewFamily.ThreeDimensional)
+    existing_count = sum(1 for name in ctx["view3d_names"] if name.startswith(prefix))
 
     # split off the last number of the base code
     parts = base.split(".")
@@ -1868,17 +2078,14 @@ for base in {base}:  # e.g. 5.1.1
     sheet_suffix = "{}.{}".format(major, new_last)
 
     # 2. create an isometric 3D view
-    view3d = View3D.CreateIsometric(doc, v3d_type.Id)
+    view3d = View3D.CreateIsometric(doc, ctx["v3d_type"].Id)
     view3d.Name = "{} - Sheet {}".format(base, sheet_suffix)
     # force it into the Architectural branch of the browser
     view3d.Discipline = ViewDiscipline.Architectural
     view3d.Scale = 25
 
     # apply your A00_Algemeen 3D View Template
-    tmpl = next(
-        (v for v in all3d_views if v.IsTemplate and v.Name == "S4R_A00_Algemeen_3D"),
-        None,
-    )
+    tmpl = ctx["view3d_template"]
     if tmpl:
         view3d.ViewTemplateId = tmpl.Id
 
@@ -1888,8 +2095,8 @@ for base in {base}:  # e.g. 5.1.1
 
     # 3. use the same region bounding box you computed earlier
     section_bb = BoundingBoxXYZ()
-    section_bb.Min = region_min
-    section_bb.Max = region_max
+    section_bb.Min = ctx["region_min"]
+    section_bb.Max = ctx["region_max"]
     view3d.SetSectionBox(section_bb)
 
     view3d.IsSectionBoxActive = True
@@ -1902,21 +2109,99 @@ for base in {base}:  # e.g. 5.1.1
     Viewport.Create(doc, sheet.Id, view3d.Id, v3d_pos)
 
     t3.Commit()
+    return sheet, tb_center
+
+
+# one pass over the 3D views: names for the per-sheet count, plus the template
+view3d_names = []
+view3d_template = None
+for v in FilteredElementCollector(doc).OfClass(View3D):
+    name = v.Name
+    view3d_names.append(name)
+    if view3d_template is None and v.IsTemplate and name == "S4R_A00_Algemeen_3D":
+        view3d_template = v
+
+sheet_ctx = {
+    "existing_numbers": existing_numbers,
+    "title_block": title_block,
+    "plan_view": new_view,
+    "region_min": region_min,
+    "region_max": region_max,
+    # 1. pick a 3D ViewFamilyType
+    "v3d_type": next(
+        v
+        for v in FilteredElementCollector(doc).OfClass(ViewFamilyType)
+        if v.ViewFamily == ViewFamily.ThreeDimensional
+    ),
+    "view3d_names": view3d_names,
+    "view3d_template": view3d_template,
+}
+sheet, tb_center = create_sheet_for_base(base, sheet_ctx)  # e.g. 5.1.1
+
 
+# --- Helper functions to find fields by name
+def get_schedule_fields_by_name(fields):
+    """Map field name -> ScheduleField; the first field in field order wins."""
+    fields_by_name = {}
+    for sf in fields:
+        fields_by_name.setdefault(sf.GetName(), sf)
+    return fields_by_name
 
-# --- Helper function to find field by name
-def find_schedule_field_by_name(sd, field_name):
-    for f_id in sd.GetFieldOrder():
-        sf = sd.GetField(f_id)
-        if sf.GetName() == field_name:
-            return sf
-    raise Exception("Field not found: {}".format(field_name))
+
+def find_schedule_field_by_name(fields_by_name, field_name):
+    sf = fields_by_name.get(field_name)
+    if sf is None:
+        raise Exception("Field not found: {}".format(field_name))
+    return sf
 
 
 # --- Main script
-all_schedules = FilteredElementCollector(doc).OfClass(ViewSchedule).ToElements()
-fittings_master = next(s for s in all_schedules if s.Name == "Geberit PE fittingen")
-pipes_master = next(s for s in all_schedules if s.Name == "Geberit PE leidingen")
+COMMENTS_PARAM_ID = ElementId(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
+
+# walk the schedules lazily and stop as soon as both masters are found
+master_names = ("Geberit PE fittingen", "Geberit PE leidingen")
+masters = {}
+for s in FilteredElementCollector(doc).OfClass(ViewSchedule):
+    if s.Name in master_names:
+        masters.setdefault(s.Name, s)
+        if len(masters) == len(master_names):
+            break
+fittings_master = masters["Geberit PE fittingen"]
+pipes_master = masters["Geberit PE leidingen"]
+
+# --- schedule text type (Arial 1.5 mm), the same for every schedule below
+# Convert 1.5 mm to internal Revit feet (1 foot = 304.8 mm)
+target_font = "Arial"
+target_mm = 1.5
+target_ft = target_mm / 304.8
+# sizes within this many feet (about 0.03 mm) count as the same size
+target_tol_ft = 1e-4
+
+# Search existing text types; the size is only read when the font matches
+text_types = FilteredElementCollector(doc).OfClass(TextNoteType).ToElements()
+matching_type_id = None
+for tt in text_types:
+    try:
+        if tt.get_Parameter(BuiltInParameter.TEXT_FONT).AsString() != target_font:
+            continue
+        size = tt.get_Parameter(BuiltInParameter.TEXT_SIZE).AsDouble()
+        if abs(size - target_ft) < target_tol_ft:
+            matching_type_id = tt.Id
+            break
+    except:
+        continue
+
+# If not found, duplicate the first one and create the target
+if not matching_type_id and text_types:
+    source_type = text_types[0]
+    t = Transaction(doc, "Create Arial 1.5mm Text Type")
+    t.Start()
+    new_type_id = source_type.Duplicate("Arial 1.5mm")
+    new_type = doc.GetElement(new_type_id)
+    new_type.get_Parameter(BuiltInParameter.TEXT_FONT).Set(target_font)
+    new_type.get_Parameter(BuiltInParameter.TEXT_SIZE).Set(target_ft)
+    t.Commit()
+    matching_type_id = new_type_id
 
 t = Transaction(doc, "Duplicate & Configure Schedules")
 t.Start()
@@ -1932,47 +2217,19 @@ for master, is_pipe, idx in tasks:
     dup_id = master.Duplicate(ViewDuplicateOption.Duplicate)
     dup = doc.GetElement(dup_id)
     dup.Name = "{} {}".format(master.Name, sheet_code)
-    # Convert 1.5 mm to internal Revit feet (1 foot = 304.8 mm)
-    target_font = "Arial"
-    target_mm = 1.5
-    target_ft = target_mm / 304.8
-
-    # Search existing text types
-    text_types = FilteredElementCollector(doc).OfClass(TextNoteType).ToElements()
-    matching_type = None
-    for tt in text_types:
-        try:
-            font = tt.get_Parameter(BuiltInParameter.TEXT_FONT).AsString()
-            size = tt.get_Parameter(BuiltInParameter.TEXT_SIZE).AsDouble()
-            if font == target_font and abs(size - target_ft) < 0.001:
-                matching_type = tt
-                break
-        except:
-            continue
-
-    # If not found, duplicate the first one and create the target
-    if not matching_type and text_types:
-        source_type = text_types[0]
-        t = Transaction(doc, "Create Arial 1.5mm Text Type")
-        t.Start()
-        new_type_id = source_type.Duplicate("Arial 1.5mm")
-        new_type = doc.GetElement(new_type_id)
-        new_type.get_Parameter(BuiltInParameter.TEXT_FONT).Set(target_font)
-        new_type.get_Parameter(BuiltInParameter.TEXT_SIZE).Set(target_ft)
-        t.Commit()
-        matching_type = new_type
-
     # Apply it to the schedule view if available
-    if matching_type:
-        dup.TitleTextTypeId = matching_type.Id
-        dup.HeaderTextTypeId = matching_type.Id
-        dup.BodyTextTypeId = matching_type.Id
+    if matching_type_id:
+        dup.TitleTextTypeId = matching_type_id
+        dup.HeaderTextTypeId = matching_type_id
+        dup.BodyTextTypeId = matching_type_id
 
     sd = dup.Definition
+    # every field in field order, fetched once for the lookups below
+    fields = [sd.GetField(f_id) for f_id in sd.GetFieldOrder()]
+
     # --- if it's a Leidingen (pipes) schedule, change Length field to millimeters ---
     if is_pipe:
-        for f_id in sd.GetFieldOrder():
-            field = sd.GetField(f_id)
+        for field in fields:
             if field.GetName().lower().startswith("length"):
                 opts = field.GetFormatOptions()
                 opts.UseDefault = False
@@ -1980,25 +2237,24 @@ for master, is_pipe, idx in tasks:
                 opts.Accuracy = 0.1
                 field.SetFormatOptions(opts)
                 break
-    comments_param = ElementId(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
 
     # --- find the schedule-field ID that corresponds to "Comments" ---
-    comment_field = None
-    for f_id in sd.GetFieldOrder():
-        sf = sd.GetField(f_id)
-        if sf.ParameterId == comments_param:
-            comment_field = sf
-            break
+    comment_field = next(
+        (sf for sf in fields if sf.ParameterId == COMMENTS_PARAM_ID), None
+    )
 
     # If "Comments" column not found yet, add it
     if comment_field is None:
         cm_sched_field = next(
-            f for f in sd.GetSchedulableFields() if f.ParameterId == comments_param
+            f for f in sd.GetSchedulableFields() if f.ParameterId == COMMENTS_PARAM_ID
         )
         sf = sd.AddField(cm_sched_field)
         comment_field = sf
+        fields.append(sf)
 
     comment_field_id = comment_field.FieldId
+    # name -> field, now that the Comments field is in place
+    fields_by_name = get_schedule_fields_by_name(fields)
 
     # --- clear out any existing Comments-filters ---
     for i in reversed(range(sd.GetFilterCount())):
@@ -2017,9 +2273,9 @@ for master, is_pipe, idx in tasks:
     # --- add correct sorting based on schedule type
     if is_pipe:
         # Leidingen sorting
-        seg_field = find_schedule_field_by_name(sd, "Segment Description")
-        art_field = find_schedule_field_by_name(sd, "Article Nr")
-        od_field = find_schedule_field_by_name(sd, "Outside Diameter")
+        seg_field = find_schedule_field_by_name(fields_by_name, "Segment Description")
+        art_field = find_schedule_field_by_name(fields_by_name, "Article Nr")
+        od_field = find_schedule_field_by_name(fields_by_name, "Outside Diameter")
 
         grp1 = ScheduleSortGroupField(seg_field.FieldId, ScheduleSortOrder.Ascending)
         grp1.ShowHeader = True
@@ -2035,8 +2291,10 @@ for master, is_pipe, idx in tasks:
 
     else:
         # Fittingen sorting
-        cm_field = find_schedule_field_by_name(sd, "Comments")
-        prod_field = find_schedule_field_by_name(sd, "NLRS_C_code_fabrikant_product")
+        cm_field = find_schedule_field_by_name(fields_by_name, "Comments")
+        prod_field = find_schedule_field_by_name(
+            fields_by_name, "NLRS_C_code_fabrikant_product"
+        )
 
         grp1 = ScheduleSortGroupField(cm_field.FieldId, ScheduleSortOrder.Ascending)
         grp1.ShowHeader = True
@@ -2076,17 +2334,13 @@ for vp in viewports:
     vp.SetBoxCenter(sheet_center)
 
 # 3. Find all schedules on the sheet and center them nicely stacked
-schedules = (
-    FilteredElementCollector(doc, sheet.Id).OfClass(ScheduleSheetInstance).ToElements()
-)
-
 schedule_offset = 0.15  # Offset down between schedules (adjust if needed)
-normal_schedules = []
-
-for sch in schedules:
-    if sch.IsTitleblockRevisionSchedule:
-        continue
-    normal_schedules.append(sch)
+# streamed straight from the collector; the list is only moved afterwards
+normal_schedules = [
+    sch
+    for sch in FilteredElementCollector(doc, sheet.Id).OfClass(ScheduleSheetInstance)
+    if not sch.IsTitleblockRevisionSchedule
+]
 
 for idx, sch in enumerate(normal_schedules):
     sch_point = XYZ(sheet_center.X, sheet_center.Y - (idx * schedule_offset), 0)